@@ -1,91 +1,164 @@
 """
 Configuration settings for SUMO Helper Backend
 Environment-based configuration with production defaults
+
+Environment variables are parsed once per process: get_config() builds a
+frozen Config instance on first call and returns the same object afterwards.
 """
 
 import os
-from typing import List
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Tuple
+
+
+def _env_str(name: str, default: str) -> str:
+    """Field factory reading a string environment variable"""
+    return field(default_factory=lambda: os.getenv(name, default))
+
+
+def _env_int(name: str, default: str) -> int:
+    """Field factory reading an integer environment variable"""
+    return field(default_factory=lambda: int(os.getenv(name, default)))
+
+
+def _env_float(name: str, default: str) -> float:
+    """Field factory reading a float environment variable"""
+    return field(default_factory=lambda: float(os.getenv(name, default)))
+
+
+def _env_bool(name: str, default: str) -> bool:
+    """Field factory reading a boolean ("true"/"false") environment variable"""
+    return field(default_factory=lambda: os.getenv(name, default).lower() == "true")
+
 
+def _env_list(name: str, default: str) -> Tuple[str, ...]:
+    """Field factory reading a comma-separated environment variable"""
+    return field(default_factory=lambda: tuple(os.getenv(name, default).split(",")))
+
+
+@dataclass(frozen=True, slots=True)
 class Config:
     """Base configuration class"""
-    
+
     # Application settings
-    APP_NAME = "SUMO Helper API"
-    APP_VERSION = "1.0.0"
-    DEBUG = False
-    
+    APP_NAME: str = "SUMO Helper API"
+    APP_VERSION: str = "1.0.0"
+    ENVIRONMENT: str = _env_str("ENVIRONMENT", "development")
+    DEBUG: bool = False
+
     # Server settings
-    HOST = os.getenv("HOST", "0.0.0.0")
-    PORT = int(os.getenv("PORT", "8000"))
-    
+    HOST: str = _env_str("HOST", "0.0.0.0")
+    PORT: int = _env_int("PORT", "8000")
+    WORKERS: int = _env_int("WEB_CONCURRENCY", "1")
+
     # CORS settings
-    ALLOWED_ORIGINS = os.getenv(
-        "ALLOWED_ORIGINS", 
+    ALLOWED_ORIGINS: Tuple[str, ...] = _env_list(
+        "ALLOWED_ORIGINS",
         "http://localhost:5173,http://127.0.0.1:5173"
-    ).split(",")
-    
+    )
+
     # Logging settings
-    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-    LOG_FILE = os.getenv("LOG_FILE", "sumo_helper.log")
-    LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    
+    LOG_LEVEL: str = _env_str("LOG_LEVEL", "INFO")
+    LOG_FILE: str = _env_str("LOG_FILE", "sumo_helper.log")
+    LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
     # File storage settings
-    STATIC_DIR = "static"
-    MAPS_DIR = os.path.join(STATIC_DIR, "maps")
-    NETWORKS_DIR = os.path.join(STATIC_DIR, "networks")
-    SIMULATIONS_DIR = os.path.join(STATIC_DIR, "simulations")
-    UPLOADS_DIR = os.path.join(STATIC_DIR, "uploads")
-    
+    STATIC_DIR: str = "static"
+    MAPS_DIR: str = os.path.join("static", "maps")
+    NETWORKS_DIR: str = os.path.join("static", "networks")
+    SIMULATIONS_DIR: str = os.path.join("static", "simulations")
+    UPLOADS_DIR: str = os.path.join("static", "uploads")
+    EXPORTS_DIR: str = os.path.join("static", "exports")
+
     # OSM settings
-    OSM_TIMEOUT = int(os.getenv("OSM_TIMEOUT", "30"))
-    OSM_MAX_AREA_SIZE = float(os.getenv("OSM_MAX_AREA_SIZE", "0.01"))
-    OSM_ROAD_FILTER = os.getenv("OSM_ROAD_FILTER", "motorway|trunk|primary|secondary")
-    
+    OSM_TIMEOUT: int = _env_int("OSM_TIMEOUT", "30")
+    OSM_MAX_AREA_SIZE: float = _env_float("OSM_MAX_AREA_SIZE", "0.01")
+    OSM_ROAD_FILTER: str = _env_str(
+        "OSM_ROAD_FILTER",
+        "motorway|trunk|primary|secondary|tertiary|residential|service"
+    )
+    # Raw Overpass downloads kept for reuse: most recent entries, max age in seconds
+    OSM_DOWNLOAD_CACHE_ENTRIES: int = _env_int("OSM_DOWNLOAD_CACHE_ENTRIES", "64")
+    OSM_DOWNLOAD_CACHE_TTL: int = _env_int("OSM_DOWNLOAD_CACHE_TTL", "86400")
+    # Derived from OSM_ROAD_FILTER once in __post_init__
+    OSM_CUSTOM_FILTER: str = field(init=False)
+
     # SUMO settings
-    SUMO_HOME = os.getenv("SUMO_HOME", "/usr/share/sumo")
-    SUMO_GUI_PATH = os.getenv("SUMO_GUI_PATH", "sumo-gui")
-    SUMO_PATH = os.getenv("SUMO_PATH", "sumo")
-    
+    SUMO_HOME: str = _env_str("SUMO_HOME", "/usr/share/sumo")
+    SUMO_GUI_PATH: str = _env_str("SUMO_GUI_PATH", "sumo-gui")
+    SUMO_PATH: str = _env_str("SUMO_PATH", "sumo")
+
     # Simulation settings
-    DEFAULT_SIMULATION_TIME = int(os.getenv("DEFAULT_SIMULATION_TIME", "3600"))
-    MAX_SIMULATION_TIME = int(os.getenv("MAX_SIMULATION_TIME", "7200"))
+    DEFAULT_SIMULATION_TIME: int = _env_int("DEFAULT_SIMULATION_TIME", "3600")
+    MAX_SIMULATION_TIME: int = _env_int("MAX_SIMULATION_TIME", "7200")
+    # Converted networks kept in the content-hash cache (least recently used are removed)
+    SUMO_CONVERSION_CACHE_ENTRIES: int = _env_int("SUMO_CONVERSION_CACHE_ENTRIES", "64")
+    # Also load converted networks with sumolib (slower) instead of only stream-checking them
+    STRICT_NETWORK_VALIDATION: bool = _env_bool("STRICT_NETWORK_VALIDATION", "false")
+
+    # Export archives kept for reuse by identical exports (least recently used are removed)
+    EXPORT_CACHE_ENTRIES: int = _env_int("EXPORT_CACHE_ENTRIES", "100")
     
+    # Hand file downloads to a fronting nginx via X-Accel-Redirect (STATIC_DIR
+    # must be exposed there as an internal location at X_ACCEL_PREFIX)
+    USE_X_ACCEL: bool = _env_bool("USE_X_ACCEL", "false")
+    X_ACCEL_PREFIX: str = _env_str("X_ACCEL_PREFIX", "/_static")
+
+    # Response compression for JSON API responses
+    GZIP_MIN_SIZE: int = _env_int("GZIP_MIN_SIZE", "1024")
+    GZIP_LEVEL: int = _env_int("GZIP_LEVEL", "5")
+
+    # Response cache (seconds) for network and map preview endpoints; the cache
+    # is in memory per process, so it is only enabled when WORKERS is 1
+    CACHE_TTL: int = _env_int("CACHE_TTL", "300")
+
     # Rate limiting (optional)
-    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
-    RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
-    RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "3600"))
+    RATE_LIMIT_ENABLED: bool = _env_bool("RATE_LIMIT_ENABLED", "false")
+    RATE_LIMIT_REQUESTS: int = _env_int("RATE_LIMIT_REQUESTS", "100")
+    RATE_LIMIT_WINDOW: int = _env_int("RATE_LIMIT_WINDOW", "3600")
+
+    def __post_init__(self) -> None:
+        """Build the Overpass road filter from OSM_ROAD_FILTER once"""
+        road_types = tuple(t.strip() for t in self.OSM_ROAD_FILTER.split("|") if t.strip())
+        object.__setattr__(self, "OSM_CUSTOM_FILTER", f'["highway"~"{"|".join(road_types)}"]')
 
+@dataclass(frozen=True, slots=True)
 class DevelopmentConfig(Config):
     """Development configuration"""
-    DEBUG = True
-    LOG_LEVEL = "DEBUG"
-    
+    DEBUG: bool = True
+    LOG_LEVEL: str = "DEBUG"
+
     # Development-specific settings
-    ALLOWED_ORIGINS = [
+    ALLOWED_ORIGINS: Tuple[str, ...] = (
         "http://localhost:5173",
         "http://127.0.0.1:5173",
         "http://localhost:3000",
         "http://127.0.0.1:3000"
-    ]
+    )
 
+@dataclass(frozen=True, slots=True)
 class ProductionConfig(Config):
     """Production configuration"""
-    DEBUG = False
-    LOG_LEVEL = "WARNING"
-    
+    DEBUG: bool = False
+    LOG_LEVEL: str = "WARNING"
+
     # Production-specific settings
-    RATE_LIMIT_ENABLED = True
+    RATE_LIMIT_ENABLED: bool = True
 
+@dataclass(frozen=True, slots=True)
 class TestingConfig(Config):
     """Testing configuration"""
-    DEBUG = True
-    LOG_LEVEL = "DEBUG"
-    
+    DEBUG: bool = True
+    LOG_LEVEL: str = "DEBUG"
+
     # Test-specific settings
-    STATIC_DIR = "test_static"
-    MAPS_DIR = os.path.join(STATIC_DIR, "maps")
-    NETWORKS_DIR = os.path.join(STATIC_DIR, "networks")
-    SIMULATIONS_DIR = os.path.join(STATIC_DIR, "simulations")
+    STATIC_DIR: str = "test_static"
+    MAPS_DIR: str = os.path.join("test_static", "maps")
+    NETWORKS_DIR: str = os.path.join("test_static", "networks")
+    SIMULATIONS_DIR: str = os.path.join("test_static", "simulations")
+    UPLOADS_DIR: str = os.path.join("test_static", "uploads")
+    EXPORTS_DIR: str = os.path.join("test_static", "exports")
 
 # Configuration mapping
 config_map = {
@@ -94,7 +167,8 @@ config_map = {
     "testing": TestingConfig
 }
 
+@lru_cache(maxsize=1)
 def get_config() -> Config:
-    """Get configuration based on environment"""
+    """Get configuration based on environment (built once per process)"""
     env = os.getenv("ENVIRONMENT", "development").lower()
-    return config_map.get(env, DevelopmentConfig)() 
\ No newline at end of file
+    return config_map.get(env, DevelopmentConfig)(ENVIRONMENT=env)
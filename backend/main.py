@@ -10,70 +10,287 @@ This module provides the FastAPI application with endpoints for:
 """
 
 import os
-import logging
+import io
+import stat
+import sys
 import shutil
-from typing import List, Dict, Optional, Any
+import zipfile
+import hashlib
+from urllib.parse import quote
+import atexit
+import asyncio
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from typing import BinaryIO, List, Dict, Literal, Optional, Any, Tuple, Union, TYPE_CHECKING
 from contextlib import asynccontextmanager
-import json
+from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.coder import Coder
+from fastapi_cache.decorator import cache
+import orjson
+import ormsgpack
 import uvicorn
+from starlette.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
+from pydantic import TypeAdapter, ValidationError
 
-from services.map_service import MapService
-from services.simulation_service import SimulationService
-from services.osmnx_service import OSMNXService
-from services.sumo_export_service import SUMOExportService
+from config import get_config
 from models.schemas import (
     MapSelection, 
     RouteConfig, 
     VehicleType,
-    SimulationExportConfig
+    SimulationExportConfig,
+    SimulationMetadata
 )
 
+if TYPE_CHECKING:
+    # Service modules pull in osmnx/sumolib/folium; they are imported lazily
+    # in lifespan() so that importing this module stays cheap.
+    from services.map_service import MapService
+    from services.simulation_service import SimulationService
+    from services.osmnx_service import OSMNXService
+    from services.sumo_export_service import SUMOExportService
+
+# Environment configuration (parsed once in config.py)
+cfg = get_config()
+
+# The app's own loggers (module __name__s); LOG_LEVEL applies only to these so a
+# DEBUG setting does not turn on debug output from osmnx, urllib3, matplotlib, ...
+APP_LOGGERS = ("__main__", "main", "services")
+
+def configure_logging() -> None:
+    """Route log records through a queue so file/console writes happen on a background thread"""
+    root_logger = logging.getLogger()
+    if any(isinstance(handler, QueueHandler) for handler in root_logger.handlers):
+        # Already configured, e.g. when run as __main__ and re-imported as "main" by uvicorn
+        return
+    
+    formatter = logging.Formatter(cfg.LOG_FORMAT)
+    handlers: List[logging.Handler] = [logging.FileHandler(cfg.LOG_FILE), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    root_logger.setLevel(logging.INFO)
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(cfg.LOG_LEVEL)
+    root_logger.addHandler(QueueHandler(log_queue))
+
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('sumo_helper.log'),
-        logging.StreamHandler()
-    ]
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Environment configuration
-ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
-DEBUG = ENVIRONMENT == "development"
-HOST = os.getenv("HOST", "0.0.0.0")
-PORT = int(os.getenv("PORT", "8000"))
-ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173").split(",")
+# Directories files are served from; resolved once so request paths can be checked against them
+STATIC_ROOT = Path(cfg.STATIC_DIR).resolve()
+EXPORTS_DIR = Path(cfg.EXPORTS_DIR).resolve()
+NETWORKS_DIR = Path(cfg.NETWORKS_DIR).resolve()
+
+def resolve_within(base: Path, name: str) -> Optional[Tuple[Path, os.stat_result]]:
+    """
+    Resolve a user-supplied file name under base, rejecting anything that escapes it
+    
+    Returns the path together with its stat result (so FileResponse need not
+    stat it again), or None if it is outside base or not a regular file.
+    """
+    target = (base / name).resolve()
+    if not target.is_relative_to(base):
+        return None
+    try:
+        stat_result = target.stat()
+    except OSError:
+        return None
+    if not stat.S_ISREG(stat_result.st_mode):
+        return None
+    return target, stat_result
+
+def download_response(
+    path: Union[str, Path],
+    filename: str,
+    media_type: str,
+    stat_result: Optional[os.stat_result] = None,
+    if_none_match: Optional[str] = None
+) -> Response:
+    """
+    Response for a file download under STATIC_DIR
+    
+    With USE_X_ACCEL set, only headers are returned and the fronting nginx
+    sends the file itself; otherwise FileResponse serves it (via sendfile
+    where the server supports it). When stat_result is given, FileResponse
+    sets ETag/Last-Modified up front and a matching If-None-Match gets an
+    empty 304 instead of the file.
+    """
+    if not cfg.USE_X_ACCEL:
+        response = FileResponse(path, filename=filename, media_type=media_type, stat_result=stat_result)
+        etag = response.headers.get("etag")
+        if etag and if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers={"ETag": etag})
+        return response
+    
+    relative = Path(path).resolve().relative_to(STATIC_ROOT).as_posix()
+    quoted = quote(filename)
+    if quoted == filename:
+        disposition = f'attachment; filename="{filename}"'
+    else:
+        disposition = f"attachment; filename*=utf-8''{quoted}"
+    return Response(
+        media_type=media_type,
+        headers={
+            "X-Accel-Redirect": f"{cfg.X_ACCEL_PREFIX}/{quote(relative)}",
+            "Content-Disposition": disposition
+        }
+    )
+
+def export_media_type(filename: str) -> str:
+    """Media type of an exported simulation archive"""
+    return "application/zstd" if filename.endswith(".tar.zst") else "application/zip"
+
+# Uploads are copied to disk in chunks of this size (1 MiB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+def copy_upload(source: BinaryIO, file_path: str) -> None:
+    """
+    Copy an uploaded (spooled) file to file_path
+    
+    Uses os.sendfile so the kernel copies the data directly between the two
+    files; falls back to a chunked copy where sendfile is unavailable.
+    """
+    source.seek(0)
+    with open(file_path, "wb") as target:
+        try:
+            in_fd, out_fd = source.fileno(), target.fileno()
+            offset = 0
+            while sent := os.sendfile(out_fd, in_fd, offset, 16 * UPLOAD_CHUNK_SIZE):
+                offset += sent
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            source.seek(0)
+            target.seek(0)
+            target.truncate()
+            shutil.copyfileobj(source, target, UPLOAD_CHUNK_SIZE)
+
+# Metadata members looked up in uploaded simulation ZIPs, in order of preference;
+# older exports only contain the JSON copy
+METADATA_MEMBERS = ("simulation_metadata.msgpack", "simulation_metadata.json")
+
+def read_zip_metadata(source: BinaryIO) -> Optional[Tuple[str, bytes]]:
+    """Read only the metadata member from an uploaded ZIP, straight from its spooled file"""
+    source.seek(0)
+    with zipfile.ZipFile(source, 'r') as zipf:
+        for member in METADATA_MEMBERS:
+            try:
+                return member, zipf.read(member)
+            except KeyError:
+                continue
+    return None
+
+# Vehicle types are constant; serialize them once at import time
+VEHICLE_TYPES = [
+    VehicleType(id="passenger", name="Passenger Car", length=5.0, max_speed=16.67),
+    VehicleType(id="bus", name="Bus", length=12.0, max_speed=13.89),
+    VehicleType(id="truck", name="Truck", length=8.0, max_speed=11.11),
+    VehicleType(id="motorcycle", name="Motorcycle", length=2.5, max_speed=20.83),
+    VehicleType(id="bicycle", name="Bicycle", length=1.6, max_speed=5.56)
+]
+VEHICLE_TYPES_JSON = orjson.dumps([vehicle_type.model_dump() for vehicle_type in VEHICLE_TYPES])
+VEHICLE_TYPES_HEADERS = {
+    "Cache-Control": "public, max-age=86400",
+    "ETag": f'"{hashlib.sha1(VEHICLE_TYPES_JSON).hexdigest()}"'
+}
+
+# The root endpoint only reports static settings
+ROOT_JSON = orjson.dumps({
+    "message": cfg.APP_NAME,
+    "version": cfg.APP_VERSION,
+    "environment": cfg.ENVIRONMENT,
+    "status": "running"
+})
+
+# Built once; dumps a whole route list to plain dicts in a single pydantic-core call
+ROUTE_LIST_ADAPTER = TypeAdapter(List[RouteConfig])
+
+# Endpoints that stream files (ZIP archives or sendfile-able exports); never gzip these
+FILE_ROUTE_PREFIXES = ("/api/simulations/export/", "/api/simulations/download/")
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """GZip API responses while leaving file downloads to FileResponse/sendfile"""
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "")
+        if scope["type"] == "http" and not (
+            path.startswith(FILE_ROUTE_PREFIXES) or path.endswith(("/export", ".zip"))
+        ):
+            await super().__call__(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
 
 # Global services
-map_service: Optional[MapService] = None
-simulation_service: Optional[SimulationService] = None
-osmnx_service: Optional[OSMNXService] = None
-sumo_export_service: Optional[SUMOExportService] = None
+map_service: Optional["MapService"] = None
+simulation_service: Optional["SimulationService"] = None
+osmnx_service: Optional["OSMNXService"] = None
+sumo_export_service: Optional["SUMOExportService"] = None
+
+def build_health_prefix() -> bytes:
+    """Serialize the static part of the /health body; the connection count is appended per request"""
+    body = orjson.dumps({
+        "status": "healthy",
+        "services": {
+            "map_service": map_service is not None,
+            "simulation_service": simulation_service is not None,
+            "osmnx_service": osmnx_service is not None,
+            "sumo_export_service": sumo_export_service is not None
+        },
+        "message": "API is running"
+    })
+    return body[:-1] + b',"websocket_connections":'
+
+# Rebuilt in lifespan once the services have been initialized
+health_body_prefix = build_health_prefix()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager for startup and shutdown"""
-    global map_service, simulation_service, osmnx_service, sumo_export_service
+    global map_service, simulation_service, osmnx_service, sumo_export_service, health_body_prefix
     
     # Startup
     logger.info("Starting SUMO Helper API...")
+    # InMemoryBackend is per process: FastAPICache.clear() in one worker would
+    # leave the others serving stale previews, so only cache with one worker
+    cache_enabled = cfg.WORKERS == 1
+    if not cache_enabled:
+        logger.warning("Response cache disabled: in-memory cache is per process and WEB_CONCURRENCY=%s", cfg.WORKERS)
+    FastAPICache.init(InMemoryBackend(), prefix="sumo", coder=ORJSONCoder, enable=cache_enabled)
+    
+    # Create storage directories once here instead of on each request
+    for directory in (cfg.MAPS_DIR, cfg.NETWORKS_DIR, cfg.SIMULATIONS_DIR, cfg.UPLOADS_DIR, cfg.EXPORTS_DIR):
+        os.makedirs(directory, exist_ok=True)
+    
     try:
+        from services.map_service import MapService
+        from services.simulation_service import SimulationService
+        from services.osmnx_service import OSMNXService
+        from services.sumo_export_service import SUMOExportService
+
         map_service = MapService()
         simulation_service = SimulationService()
         osmnx_service = OSMNXService()
         sumo_export_service = SUMOExportService()
         logger.info("Services initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to initialize services: {e}")
+        logger.error("Failed to initialize services: %s", e)
         # Don't raise the exception, just log it and continue
         # This allows the API to start even if some services fail
+    health_body_prefix = build_health_prefix()
     
     yield
     
@@ -81,100 +298,134 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down SUMO Helper API...")
     # Cleanup resources if needed
 
+# Shared by the response class and the response cache coder
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+class NumpyORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, including NumPy arrays/scalars and non-string dict keys"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+class ORJSONCoder(Coder):
+    """fastapi-cache coder using orjson instead of the stdlib json encoder"""
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        return orjson.dumps(value, option=ORJSON_OPTIONS)
+
+    @classmethod
+    def decode(cls, value: bytes) -> Any:
+        return orjson.loads(value)
+
 # Create FastAPI application
 app = FastAPI(
-    title="SUMO Helper API",
+    title=cfg.APP_NAME,
     description="Web-based traffic simulation tool with OSM integration",
-    version="1.0.0",
-    debug=DEBUG,
+    version=cfg.APP_VERSION,
+    debug=cfg.DEBUG,
+    default_response_class=NumpyORJSONResponse,
     lifespan=lifespan
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=ALLOWED_ORIGINS,
+    allow_origins=list(cfg.ALLOWED_ORIGINS),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Static files
-os.makedirs("static", exist_ok=True)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Compress large JSON payloads (network nodes/edges, map previews)
+app.add_middleware(JSONGZipMiddleware, minimum_size=cfg.GZIP_MIN_SIZE, compresslevel=cfg.GZIP_LEVEL)
+
+# Static files (the directory is created in lifespan startup)
+app.mount("/static", StaticFiles(directory=cfg.STATIC_DIR, check_dir=False), name="static")
 
-# WebSocket connections
-active_connections: List[WebSocket] = []
+# WebSocket connections, each with a bounded outgoing queue drained by its own writer task
+WS_SEND_QUEUE_SIZE = 64
+WS_BROADCAST_BATCH_SIZE = 50
+WS_COALESCE_MAX = 32
+active_connections: Dict[WebSocket, "asyncio.Queue[str]"] = {}
+
+def enqueue_message(send_queue: "asyncio.Queue[str]", message: str) -> None:
+    """Queue a message without blocking; when the client lags, drop its oldest message"""
+    try:
+        send_queue.put_nowait(message)
+    except asyncio.QueueFull:
+        send_queue.get_nowait()
+        send_queue.put_nowait(message)
+
+async def drain_send_queue(websocket: WebSocket, send_queue: "asyncio.Queue[str]") -> None:
+    """
+    Writer task: send queued messages to one client until it goes away
+    
+    Every frame has the same shape: a JSON array of message strings. A lone
+    message is a one-element array; when a burst has queued up, up to
+    WS_COALESCE_MAX messages share one frame, in the order they were queued.
+    """
+    send_text = websocket.send_text
+    get_nowait = send_queue.get_nowait
+    try:
+        while True:
+            batch = [await send_queue.get()]
+            while len(batch) < WS_COALESCE_MAX and not send_queue.empty():
+                batch.append(get_nowait())
+            await send_text(orjson.dumps(batch).decode())
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning("Failed to send message to WebSocket: %s", e)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time communication"""
     await websocket.accept()
-    active_connections.append(websocket)
-    logger.info(f"WebSocket connected. Total connections: {len(active_connections)}")
+    send_queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+    writer = asyncio.create_task(drain_send_queue(websocket, send_queue))
+    active_connections[websocket] = send_queue
+    logger.info("WebSocket connected. Total connections: %s", len(active_connections))
+    
+    # Checked once per connection so the message loop skips the logging call entirely
+    log_messages = logger.isEnabledFor(logging.DEBUG)
     
     try:
-        while True:
-            data = await websocket.receive_text()
-            logger.debug(f"WebSocket message received: {data}")
-            await websocket.send_text(f"Message received: {data}")
-    except WebSocketDisconnect:
-        active_connections.remove(websocket)
-        logger.info(f"WebSocket disconnected. Total connections: {len(active_connections)}")
+        # iter_text() ends cleanly when the client disconnects
+        async for data in websocket.iter_text():
+            if log_messages:
+                logger.debug("WebSocket message received: %s", data)
+            enqueue_message(send_queue, "Message received: " + data)
+    finally:
+        active_connections.pop(websocket, None)
+        writer.cancel()
+        logger.info("WebSocket disconnected. Total connections: %s", len(active_connections))
 
 async def broadcast_message(message: str):
-    """Send message to all connected WebSocket clients"""
-    disconnected = []
-    for connection in active_connections:
-        try:
-            await connection.send_text(message)
-        except Exception as e:
-            logger.warning(f"Failed to send message to WebSocket: {e}")
-            disconnected.append(connection)
-    
-    # Remove disconnected connections
-    for connection in disconnected:
-        active_connections.remove(connection)
+    """Queue message for all connected WebSocket clients; slow clients never block the others"""
+    send_queues = tuple(active_connections.values())
+    for start in range(0, len(send_queues), WS_BROADCAST_BATCH_SIZE):
+        if start:
+            # Let writer tasks and requests run between batches on large fan-outs
+            await asyncio.sleep(0)
+        for send_queue in send_queues[start:start + WS_BROADCAST_BATCH_SIZE]:
+            enqueue_message(send_queue, message)
 
 # Health and status endpoints
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "message": "SUMO Helper API",
-        "version": "1.0.0",
-        "environment": ENVIRONMENT,
-        "status": "running"
-    }
+    return Response(content=ROOT_JSON, media_type="application/json")
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    try:
-        # Check if services are available
-        services_status = {
-            "map_service": map_service is not None,
-            "simulation_service": simulation_service is not None,
-            "osmnx_service": osmnx_service is not None,
-            "sumo_export_service": sumo_export_service is not None
-        }
-        
-        # Consider healthy if at least the basic API is running
-        # Services can be initialized later
-        return {
-            "status": "healthy",
-            "services": services_status,
-            "websocket_connections": len(active_connections),
-            "message": "API is running"
-        }
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        # Return 200 even if there are issues, just log them
-        return {
-            "status": "degraded",
-            "error": str(e),
-            "message": "API is running but some services may be unavailable"
-        }
+    # Consider healthy if at least the basic API is running; services can be
+    # initialized later. Only the connection count changes between probes.
+    return Response(
+        content=health_body_prefix + str(len(active_connections)).encode() + b"}",
+        media_type="application/json"
+    )
 
 # Map Selection and OSM Integration
 @app.post("/api/maps/select-area")
@@ -184,7 +435,7 @@ async def select_map_area(selection: MapSelection):
         raise HTTPException(status_code=503, detail="OSM service not available")
     
     try:
-        logger.info(f"Selecting map area: {selection.place_name or 'Custom area'}")
+        logger.info("Selecting map area: %s", selection.place_name or 'Custom area')
         result = await osmnx_service.select_area(
             north=selection.north,
             south=selection.south,
@@ -192,24 +443,27 @@ async def select_map_area(selection: MapSelection):
             west=selection.west,
             place_name=selection.place_name
         )
-        logger.info(f"Map area selected successfully: {result.get('map_id', 'unknown')}")
-        return result
+        # Re-selecting an area overwrites the map with the same ID
+        await FastAPICache.clear(namespace="maps")
+        logger.info("Map area selected successfully: %s", result.get('map_id', 'unknown'))
+        return NumpyORJSONResponse(result)
     except Exception as e:
-        logger.error(f"Failed to select map area: {e}")
+        logger.error("Failed to select map area: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/maps/preview/{map_id}")
+@cache(expire=cfg.CACHE_TTL, namespace="maps")
 async def get_map_preview(map_id: str):
     """Get a preview of the selected map area"""
     if osmnx_service is None:
         raise HTTPException(status_code=503, detail="OSM service not available")
     
     try:
-        logger.info(f"Getting map preview for: {map_id}")
+        logger.info("Getting map preview for: %s", map_id)
         preview_data = await osmnx_service.get_map_preview(map_id)
         return preview_data
     except Exception as e:
-        logger.error(f"Failed to get map preview for {map_id}: {e}")
+        logger.error("Failed to get map preview for %s: %s", map_id, e)
         raise HTTPException(status_code=404, detail=str(e))
 
 @app.post("/api/maps/convert-to-sumo/{map_id}")
@@ -219,49 +473,53 @@ async def convert_to_sumo(map_id: str):
         raise HTTPException(status_code=503, detail="OSM service not available")
     
     try:
-        logger.info(f"Converting map to SUMO format: {map_id}")
+        logger.info("Converting map to SUMO format: %s", map_id)
         result = await osmnx_service.convert_to_sumo(map_id)
-        logger.info(f"Map converted successfully: {map_id}")
-        return result
+        await FastAPICache.clear(namespace="networks")
+        logger.info("Map converted successfully: %s", map_id)
+        return NumpyORJSONResponse(result)
     except Exception as e:
-        logger.error(f"Failed to convert map {map_id}: {e}")
+        logger.error("Failed to convert map %s: %s", map_id, e)
         raise HTTPException(status_code=400, detail=str(e))
 
 # Network Analysis
 @app.get("/api/networks/{network_id}")
-async def get_network_data(network_id: str):
-    """Get network data (nodes, edges, coordinates)"""
+@cache(expire=cfg.CACHE_TTL, namespace="networks")
+async def get_network_data(network_id: str, layout: Literal["records", "columnar"] = "records"):
+    """Get network data (nodes, edges, coordinates); layout=columnar returns field -> list columns"""
     try:
-        logger.info(f"Getting network data for: {network_id}")
-        network_data = await map_service.get_network_data(network_id)
-        logger.info(f"Network data retrieved: {len(network_data.get('nodes', []))} nodes, {len(network_data.get('edges', []))} edges")
+        logger.info("Getting network data for: %s", network_id)
+        network_data = await map_service.get_network_data(network_id, columnar=layout == "columnar")
+        logger.info("Network data retrieved: %s (%s layout)", network_id, layout)
         return network_data
     except Exception as e:
-        logger.error(f"Failed to get network data for {network_id}: {e}")
+        logger.error("Failed to get network data for %s: %s", network_id, e)
         raise HTTPException(status_code=404, detail=str(e))
 
 @app.get("/api/networks/{network_id}/entry-points")
+@cache(expire=cfg.CACHE_TTL, namespace="networks")
 async def get_entry_points(network_id: str):
     """Get available entry points for the network"""
     try:
-        logger.info(f"Getting entry points for: {network_id}")
+        logger.info("Getting entry points for: %s", network_id)
         entry_points = await map_service.get_entry_points(network_id)
-        logger.info(f"Found {len(entry_points)} entry points")
+        logger.info("Found %s entry points", len(entry_points))
         return entry_points
     except Exception as e:
-        logger.error(f"Failed to get entry points for {network_id}: {e}")
+        logger.error("Failed to get entry points for %s: %s", network_id, e)
         raise HTTPException(status_code=404, detail=str(e))
 
 @app.get("/api/networks/{network_id}/exit-points")
+@cache(expire=cfg.CACHE_TTL, namespace="networks")
 async def get_exit_points(network_id: str):
     """Get available exit points for the network"""
     try:
-        logger.info(f"Getting exit points for: {network_id}")
+        logger.info("Getting exit points for: %s", network_id)
         exit_points = await map_service.get_exit_points(network_id)
-        logger.info(f"Found {len(exit_points)} exit points")
+        logger.info("Found %s exit points", len(exit_points))
         return exit_points
     except Exception as e:
-        logger.error(f"Failed to get exit points for {network_id}: {e}")
+        logger.error("Failed to get exit points for %s: %s", network_id, e)
         raise HTTPException(status_code=404, detail=str(e))
 
 # Route Configuration
@@ -269,71 +527,75 @@ async def get_exit_points(network_id: str):
 async def configure_routes(network_id: str, routes: List[RouteConfig]):
     """Configure routes between entry and exit points"""
     try:
-        logger.info(f"Configuring routes for network: {network_id}")
-        result = await map_service.configure_routes(network_id, routes)
-        logger.info(f"Routes configured successfully: {len(routes)} routes")
-        return result
+        logger.info("Configuring routes for network: %s", network_id)
+        result = await map_service.configure_routes(network_id, ROUTE_LIST_ADAPTER.dump_python(routes))
+        logger.info("Routes configured successfully: %s routes", len(routes))
+        return NumpyORJSONResponse(result)
     except Exception as e:
-        logger.error(f"Failed to configure routes for {network_id}: {e}")
+        logger.error("Failed to configure routes for %s: %s", network_id, e)
         raise HTTPException(status_code=400, detail=str(e))
 
 # Vehicle Types
-@app.get("/api/vehicle-types")
-async def get_vehicle_types():
+@app.get("/api/vehicle-types", response_model=List[VehicleType])
+async def get_vehicle_types(request: Request):
     """Get available vehicle types"""
-    vehicle_types = [
-        VehicleType(id="passenger", name="Passenger Car", length=5.0, max_speed=16.67),
-        VehicleType(id="bus", name="Bus", length=12.0, max_speed=13.89),
-        VehicleType(id="truck", name="Truck", length=8.0, max_speed=11.11),
-        VehicleType(id="motorcycle", name="Motorcycle", length=2.5, max_speed=20.83),
-        VehicleType(id="bicycle", name="Bicycle", length=1.6, max_speed=5.56)
-    ]
-    logger.info(f"Returning {len(vehicle_types)} vehicle types")
-    return vehicle_types
-
-
-
-
-
-
+    if request.headers.get("if-none-match") == VEHICLE_TYPES_HEADERS["ETag"]:
+        return Response(status_code=304, headers=VEHICLE_TYPES_HEADERS)
+    return Response(content=VEHICLE_TYPES_JSON, media_type="application/json", headers=VEHICLE_TYPES_HEADERS)
 
 # Export functionality
 @app.get("/api/networks/{network_id}/export")
-async def export_network(network_id: str, format: str = "sumo"):
+async def export_network(request: Request, network_id: str, format: str = "sumo"):
     """Export network in specified format"""
     try:
-        logger.info(f"Exporting network {network_id} in format: {format}")
+        logger.info("Exporting network %s in format: %s", network_id, format)
         
         if format == "sumo":
             file_path = await map_service.export_sumo_network(network_id)
-            return FileResponse(file_path, filename=f"{network_id}.net.xml")
+            filename = f"{network_id}.net.xml"
+            media_type = "application/xml"
         elif format == "traci":
             file_path = await map_service.export_traci_ready(network_id)
-            return FileResponse(file_path, filename=f"{network_id}_traci.zip")
+            filename = f"{network_id}_traci.zip"
+            media_type = "application/zip"
         else:
             raise HTTPException(status_code=400, detail="Unsupported format")
+        
+        # Guard against traversal via network_id; the stat feeds ETag/Last-Modified
+        resolved = resolve_within(NETWORKS_DIR, os.path.relpath(file_path, cfg.NETWORKS_DIR))
+        if resolved is None:
+            raise HTTPException(status_code=404, detail="Network not found")
+        target, stat_result = resolved
+        
+        return download_response(
+            target, filename, media_type, stat_result,
+            if_none_match=request.headers.get("if-none-match")
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Failed to export network {network_id}: {e}")
+        logger.error("Failed to export network %s: %s", network_id, e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/simulations/export/{network_id}")
 async def export_simulation(
     network_id: str,
-    config: SimulationExportConfig
+    config: SimulationExportConfig,
+    archive: Literal["zip", "tar.zst"] = "zip"
 ):
-    """Export simulation as SUMO-compatible files in ZIP format with vehicle distribution."""
+    """Export simulation as SUMO-compatible files with vehicle distribution (ZIP, or tar.zst with archive=tar.zst)."""
     try:
-        logger.info(f"Exporting simulation for network: {network_id}")
-        
-        # Get network data
-        network_data = await map_service.get_network_data(network_id)
+        logger.info("Exporting simulation for network: %s", network_id)
         
-        # Validate entry and exit points
+        # Validate entry and exit points before loading the network
         if not config.selected_entry_points:
             raise HTTPException(status_code=400, detail="No entry points selected")
         if not config.selected_exit_points:
             raise HTTPException(status_code=400, detail="No exit points selected")
         
+        # Get network data
+        network_data = await map_service.get_network_data(network_id)
+        
         # Generate routes with vehicle distribution
         routes_data = await sumo_export_service.generate_routes_with_vehicles(
             network_data=network_data,
@@ -361,38 +623,38 @@ async def export_simulation(
             simulation_config=config_data,
             selected_entry_points=config.selected_entry_points,
             selected_exit_points=config.selected_exit_points,
-            vehicle_distribution=config.vehicle_distribution
+            vehicle_distribution=config.vehicle_distribution,
+            archive_format=archive
         )
         
-        # Return the ZIP file directly
+        # Return the archive directly
         filename = os.path.basename(zip_path)
-        return FileResponse(
-            zip_path,
-            filename=filename,
-            media_type="application/zip"
-        )
+        return download_response(zip_path, filename, export_media_type(filename))
         
     except Exception as e:
-        logger.error(f"Failed to export simulation for {network_id}: {e}")
+        logger.error("Failed to export simulation for %s: %s", network_id, e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/simulations/download/{filename}")
-async def download_simulation(filename: str):
+async def download_simulation(request: Request, filename: str):
     """Download exported simulation file"""
     try:
-        file_path = os.path.join("static/exports", filename)
-        
-        if not os.path.exists(file_path):
+        # One stat for the existence check, reused by FileResponse; the file
+        # itself is sent by sendfile or nginx
+        resolved = resolve_within(EXPORTS_DIR, filename)
+        if resolved is None:
             raise HTTPException(status_code=404, detail="File not found")
+        file_path, stat_result = resolved
         
-        return FileResponse(
-            file_path, 
-            filename=filename,
-            media_type="application/zip"
+        return download_response(
+            file_path, filename, export_media_type(filename), stat_result,
+            if_none_match=request.headers.get("if-none-match")
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Failed to download simulation file {filename}: {e}")
+        logger.error("Failed to download simulation file %s: %s", filename, e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/simulations/run/{network_id}")
@@ -402,17 +664,17 @@ async def run_simulation_with_gui(
 ):
     """Run simulation with SUMO GUI using exported files."""
     try:
-        logger.info(f"Running simulation with GUI for network: {network_id}")
+        logger.info("Running simulation with GUI for network: %s", network_id)
         
-        # Get network data
-        network_data = await map_service.get_network_data(network_id)
-        
-        # Validate entry and exit points
+        # Validate entry and exit points before loading the network
         if not config.selected_entry_points:
             raise HTTPException(status_code=400, detail="No entry points selected")
         if not config.selected_exit_points:
             raise HTTPException(status_code=400, detail="No exit points selected")
         
+        # Get network data
+        network_data = await map_service.get_network_data(network_id)
+        
         # Generate routes with vehicle distribution
         routes_data = await sumo_export_service.generate_routes_with_vehicles(
             network_data=network_data,
@@ -440,10 +702,10 @@ async def run_simulation_with_gui(
             simulation_config=config_data
         )
         
-        return result
+        return NumpyORJSONResponse(result)
         
     except Exception as e:
-        logger.error(f"Failed to run simulation for {network_id}: {e}")
+        logger.error("Failed to run simulation for %s: %s", network_id, e)
         raise HTTPException(status_code=400, detail=str(e))
 
 # File upload
@@ -451,103 +713,105 @@ async def run_simulation_with_gui(
 async def upload_file(file: UploadFile = File(...)):
     """Upload a file (e.g., existing .net.xml)"""
     try:
-        logger.info(f"Uploading file: {file.filename}")
+        logger.info("Uploading file: %s", file.filename)
         
         # Validate file type
         if not file.filename.endswith('.net.xml'):
             raise HTTPException(status_code=400, detail="Only .net.xml files are supported")
         
         # Save uploaded file
-        upload_dir = "static/uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, file.filename)
+        file_path = os.path.join(cfg.UPLOADS_DIR, file.filename)
         
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Copy to disk in a worker thread so the event loop isn't blocked
+        await asyncio.to_thread(copy_upload, file.file, file_path)
         
         # Process file
         result = await map_service.process_uploaded_network(file_path)
-        logger.info(f"File uploaded and processed successfully: {file.filename}")
-        return result
+        # An upload may replace an existing network with the same ID
+        await FastAPICache.clear(namespace="networks")
+        logger.info("File uploaded and processed successfully: %s", file.filename)
+        return NumpyORJSONResponse(result)
     except Exception as e:
-        logger.error(f"Failed to upload file {file.filename}: {e}")
+        logger.error("Failed to upload file %s: %s", file.filename, e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/simulations/load-metadata")
 async def load_simulation_metadata(file: UploadFile = File(...)):
-    """Load simulation metadata from ZIP file or JSON file for reconstruction"""
+    """Load simulation metadata from a ZIP, JSON or MessagePack file for reconstruction"""
     try:
-        logger.info(f"Loading simulation metadata from: {file.filename}")
-        
-        # Read file content
-        content = await file.read()
+        logger.info("Loading simulation metadata from: %s", file.filename)
+        filename = file.filename or ""
         
         # Check if it's a ZIP file
-        if file.filename.endswith('.zip'):
-            import zipfile
-            import io
-            
+        if filename.endswith('.zip'):
             try:
-                # Open ZIP file
-                with zipfile.ZipFile(io.BytesIO(content), 'r') as zipf:
-                    # Look for simulation_metadata.json in the ZIP
-                    metadata_file_name = None
-                    for file_name in zipf.namelist():
-                        if file_name == 'simulation_metadata.json':
-                            metadata_file_name = file_name
-                            break
-                    
-                    if not metadata_file_name:
-                        raise HTTPException(status_code=400, detail="No simulation_metadata.json found in ZIP file")
-                    
-                    # Read the JSON file from ZIP
-                    with zipf.open(metadata_file_name) as json_file:
-                        json_content = json_file.read().decode('utf-8')
-                        metadata = json.loads(json_content)
+                # Open the ZIP on the spooled upload and read just the metadata member
+                found = await asyncio.to_thread(read_zip_metadata, file.file)
+                if found is None:
+                    raise HTTPException(status_code=400, detail="No simulation_metadata.json found in ZIP file")
+                metadata_file_name, raw_metadata = found
+                is_msgpack = metadata_file_name.endswith('.msgpack')
                 
-                logger.info(f"Extracted metadata from ZIP: {file.filename}")
+                logger.info("Extracted metadata from ZIP: %s", file.filename)
                 
             except zipfile.BadZipFile:
                 raise HTTPException(status_code=400, detail="Invalid ZIP file format")
+            except HTTPException:
+                raise
             except Exception as e:
                 raise HTTPException(status_code=400, detail=f"Error reading ZIP file: {str(e)}")
         
         # Check if it's a JSON file
-        elif file.filename.endswith('.json'):
-            try:
-                metadata = json.loads(content.decode('utf-8'))
-            except json.JSONDecodeError as e:
-                raise HTTPException(status_code=400, detail=f"Invalid JSON format: {str(e)}")
+        elif filename.endswith('.json'):
+            raw_metadata = await file.read()
+            is_msgpack = False
+        elif filename.endswith('.msgpack'):
+            raw_metadata = await file.read()
+            is_msgpack = True
         else:
-            raise HTTPException(status_code=400, detail="Only .zip or .json files are supported")
+            raise HTTPException(status_code=400, detail="Only .zip, .json or .msgpack files are supported")
         
-        # Validate metadata structure
-        required_fields = ['simulation_info', 'network_data', 'nodes', 'edges', 'simulation_config', 'selected_points', 'routes']
-        for field in required_fields:
-            if field not in metadata:
-                raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
+        # Parse and validate the metadata structure in one pass
+        try:
+            if is_msgpack:
+                parsed = SimulationMetadata.model_validate(ormsgpack.unpackb(raw_metadata))
+            else:
+                parsed = SimulationMetadata.model_validate_json(raw_metadata)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid simulation metadata: {e}")
+        except ormsgpack.MsgpackDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid MessagePack format: {e}")
+        metadata = parsed.model_dump()
         
-        logger.info(f"Simulation metadata loaded successfully: {metadata['simulation_info']['name']}")
+        logger.info("Simulation metadata loaded successfully: %s", parsed.simulation_info.name)
         
-        return {
+        # Returned as a response directly: the metadata embeds the full node/edge
+        # lists, and this skips FastAPI's jsonable_encoder pass over them
+        return NumpyORJSONResponse({
             "status": "success",
             "message": "Simulation metadata loaded successfully",
             "metadata": metadata,
-            "simulation_name": metadata['simulation_info']['name'],
-            "network_id": metadata['network_data']['id'],
-            "node_count": metadata['network_data']['node_count'],
-            "edge_count": metadata['network_data']['edge_count']
-        }
+            "simulation_name": parsed.simulation_info.name,
+            "network_id": parsed.network_data.id,
+            "node_count": parsed.network_data.node_count,
+            "edge_count": parsed.network_data.edge_count
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Failed to load simulation metadata: {e}")
+        logger.error("Failed to load simulation metadata: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 if __name__ == "__main__":
-    logger.info(f"Starting SUMO Helper API on {HOST}:{PORT}")
+    logger.info("Starting SUMO Helper API on %s:%s", cfg.HOST, cfg.PORT)
+    # uvloop has no Windows build; the requirements marker skips it there
     uvicorn.run(
-        app, 
-        host=HOST, 
-        port=PORT,
-        log_level="info" if DEBUG else "warning"
+        "main:app",
+        host=cfg.HOST, 
+        port=cfg.PORT,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=cfg.WORKERS,
+        log_level="info" if cfg.DEBUG else "warning"
     ) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Dict, Optional, Any
 from enum import Enum
 
@@ -86,4 +86,30 @@ class NetworkPreview(BaseModel):
     preview_url: str
     bounds: Dict[str, float]
     node_count: int
-    edge_count: int 
\ No newline at end of file
+    edge_count: int 
+
+class SimulationInfo(BaseModel):
+    """Header of an exported simulation_metadata.json"""
+    model_config = ConfigDict(extra="allow")
+    
+    name: str
+
+class SimulationNetworkInfo(BaseModel):
+    """Network summary stored in simulation metadata"""
+    model_config = ConfigDict(extra="allow")
+    
+    id: str
+    node_count: int
+    edge_count: int
+
+class SimulationMetadata(BaseModel):
+    """Simulation metadata written on export and parsed back for reconstruction"""
+    model_config = ConfigDict(extra="allow")
+    
+    simulation_info: SimulationInfo
+    network_data: SimulationNetworkInfo
+    nodes: List[Dict[str, Any]]
+    edges: List[Dict[str, Any]]
+    simulation_config: Dict[str, Any]
+    selected_points: Dict[str, Any]
+    routes: List[Dict[str, Any]]
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+File Cache Helpers
+Size and age bounds for the on-disk caches kept under static/
+"""
+
+import os
+import time
+import logging
+from typing import List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+def touch_cache_entry(path: str) -> None:
+    """Mark a cache entry as recently used (eviction is by modification time)"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_cache_dir(
+    directory: str,
+    suffix: Union[str, Tuple[str, ...]],
+    max_entries: int,
+    max_age: Optional[float] = None,
+    min_age: float = 0
+) -> List[str]:
+    """
+    Remove the least recently used entries of a cache directory
+
+    Entries are the files ending in suffix (or any of several suffixes).
+    Everything beyond the max_entries newest ones is removed, as are entries
+    older than max_age seconds. Entries used within the last min_age seconds
+    are always kept. Files that disappear concurrently (another worker
+    pruning) are ignored.
+
+    Args:
+        directory: Cache directory
+        suffix: File name suffix, or tuple of suffixes, of cache entries
+        max_entries: Number of entries to keep
+        max_age: Optional maximum age in seconds
+        min_age: Age in seconds below which entries are never removed
+
+    Returns:
+        Paths of the removed entries
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = []
+            for entry in it:
+                if not entry.name.endswith(suffix):
+                    continue
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue
+    except FileNotFoundError:
+        return []
+
+    entries.sort(reverse=True)
+    now = time.time()
+    cutoff = now - max_age if max_age is not None else None
+    removed = []
+    for index, (mtime, path) in enumerate(entries):
+        if index < max_entries and (cutoff is None or mtime >= cutoff):
+            continue
+        if now - mtime < min_age:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        removed.append(path)
+
+    if removed:
+        logger.info(f"Pruned {len(removed)} cache entries from {directory}")
+    return removed
@@ -5,17 +5,144 @@ Handles SUMO network data extraction, analysis, and visualization
 
 import os
 import json
+import array
+import asyncio
 import tempfile
 import zipfile
 import logging
-import xml.etree.ElementTree as ET
 import re
-from typing import Dict, Any, List, Optional
+import shutil
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Deque, Dict, Any, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import sumolib
 
+# lxml parses with libxml2 in C; fall back to the stdlib parser if it is not installed
+try:
+    from lxml import etree as ET
+    HAS_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAS_LXML = False
+
+# Bytes fed to the XML parser per read
+PARSE_CHUNK_SIZE = 1024 * 1024
+
+class _NetworkTarget:
+    """
+    Parser target dispatching <node> and <edge> start tags to callbacks
+    
+    Used with a target parser no element tree is built at all: each callback
+    receives the element's attribute dict and nothing else is kept.
+    """
+    
+    def __init__(self, on_node: Callable[[Dict[str, str]], None], on_edge: Callable[[Dict[str, str]], None]) -> None:
+        self.on_node = on_node
+        self.on_edge = on_edge
+    
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        if tag == 'node':
+            self.on_node(attrib)
+        elif tag == 'edge':
+            self.on_edge(attrib)
+    
+    def close(self) -> None:
+        return None
+
+def _parse_network_file(
+    net_file: str,
+    on_node: Callable[[Dict[str, str]], None],
+    on_edge: Callable[[Dict[str, str]], None]
+) -> None:
+    """Stream a network file through the parser, calling on_node/on_edge with attribute dicts"""
+    target = _NetworkTarget(on_node, on_edge)
+    if HAS_LXML:
+        # No entity expansion or network access for uploaded files
+        parser = ET.XMLParser(target=target, huge_tree=True, resolve_entities=False, no_network=True)
+    else:
+        parser = ET.XMLParser(target=target)
+    
+    with open(net_file, 'rb') as f:
+        while chunk := f.read(PARSE_CHUNK_SIZE):
+            parser.feed(chunk)
+    parser.close()
+
+def _iter_files(root: str) -> Iterator[str]:
+    """Recursively yield file paths under root (scandir entries carry their type, so no extra stat)"""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_files(entry.path)
+            elif entry.is_file():
+                yield entry.path
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _read_files_ahead(paths: Iterable[str], workers: int) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (path, data) in order while up to `workers` further files are read in threads
+    
+    Keeps reads overlapping with whatever the consumer does per file (e.g.
+    deflate) while bounding how many file buffers are held at once.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: Deque[Tuple[str, Future[bytes]]] = deque()
+        for path in paths:
+            pending.append((path, pool.submit(_read_bytes, path)))
+            if len(pending) > workers:
+                done_path, future = pending.popleft()
+                yield done_path, future.result()
+        while pending:
+            done_path, future = pending.popleft()
+            yield done_path, future.result()
+
 logger = logging.getLogger(__name__)
 
+# Network IDs built from a bounding box: map_{north}_{south}_{east}_{west} (degrees * 1000)
+_NETWORK_ID_RE = re.compile(r"map_(-?\d+)_(-?\d+)_(-?\d+)_(-?\d+)")
+
+# Field order of node and edge records (and of the columnar layout)
+NODE_FIELDS = ("id", "x", "y", "type", "lat", "lon")
+EDGE_FIELDS = ("id", "from", "to", "shape", "length", "speed", "lanes")
+
+# Already-compressed files are stored as-is in exported archives
+_COMPRESSED_SUFFIXES = ('.gz', '.zip', '.png', '.jpg', '.jpeg')
+
+# Vehicle types written at the top of every generated route file
+ROUTE_FILE_VTYPES = (
+    '  <vType id="passenger" accel="2.6" decel="4.5" sigma="0.5" length="5" minGap="2.5" maxSpeed="16.67" guiShape="passenger"/>\n'
+    '  <vType id="bus" accel="1.2" decel="4.5" sigma="0.5" length="12" minGap="3" maxSpeed="13.89" guiShape="bus"/>\n'
+    '  <vType id="truck" accel="1.3" decel="4.5" sigma="0.5" length="8" minGap="3" maxSpeed="11.11" guiShape="truck"/>\n'
+)
+ROUTE_TMPL = '  <route id="route_%d" edges="%s %s"/>\n'
+VEHICLE_TMPL = '  <vehicle id="vehicle_%d" type="%s" route="route_%d" depart="%s"/>\n'
+
+# SUMO configuration written next to every generated route file
+_CFG_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<configuration>\n'
+    '  <input>\n'
+    '    <net-file value="{net}"/>\n'
+    '    <route-files value="{route}"/>\n'
+    '  </input>\n'
+    '  <time>\n'
+    '    <begin value="0"/>\n'
+    '    <end value="3600"/>\n'
+    '  </time>\n'
+    '  <processing>\n'
+    '    <time-to-teleport value="-1"/>\n'
+    '  </processing>\n'
+    '  <routing>\n'
+    '    <device.rerouting.probability value="0.1"/>\n'
+    '  </routing>\n'
+    '</configuration>\n'
+)
+
 class MapService:
     """Service for handling SUMO network data processing and visualization"""
     
@@ -28,14 +155,108 @@ class MapService:
         os.makedirs(self.networks_dir, exist_ok=True)
         os.makedirs(self.simulations_dir, exist_ok=True)
         
+        # Parsed networks keyed by (net_file, mtime): a rewritten file gets a new
+        # key, so stale entries simply age out of the LRU. Cached values are
+        # shared between requests and must not be mutated.
+        self._load_network_cached = lru_cache(maxsize=32)(self._load_network)
+        self._read_net_cached = lru_cache(maxsize=8)(self._read_net)
+        self._terminal_points_cached = lru_cache(maxsize=8)(self._find_terminal_points)
+        
         logger.info("MapService initialized")
     
-    async def get_network_data(self, network_id: str) -> Dict[str, Any]:
+    def _network_file(self, network_id: str) -> Tuple[str, int]:
+        """
+        Return the network file path and its mtime (ns), raising if it does not exist
+        
+        A single stat covers both the existence check and the cache key.
+        """
+        net_file = os.path.join(self.networks_dir, network_id, f"{network_id}.net.xml")
+        try:
+            mtime = os.stat(net_file).st_mtime_ns
+        except OSError:
+            raise FileNotFoundError("Network file not found")
+        return net_file, mtime
+    
+    def _load_network(self, net_file: str, mtime: int) -> tuple:
+        """Parse, filter and normalize a network file (cached via _load_network_cached)"""
+        network_id = os.path.basename(net_file)[:-len(".net.xml")]
+        
+        # Parse XML directly to extract network data (already clipped to the
+        # bounding box encoded in the network ID, if any)
+        columns, edges, bounds = self._parse_network_xml(net_file, network_id)
+        
+        # Calculate normalized bounds for visualization (rescales x/y in place)
+        bounds_dict = self._calculate_normalized_bounds(columns["x"], columns["y"])
+        
+        # Node dicts are built once, from the final coordinates
+        nodes = [
+            dict(zip(NODE_FIELDS, values))
+            for values in zip(
+                columns["id"], columns["x"].tolist(), columns["y"].tolist(),
+                columns["type"], columns["lat"], columns["lon"]
+            )
+        ]
+        
+        return nodes, edges, bounds_dict
+    
+    def _read_net(self, net_file: str, mtime: int) -> Any:
+        """Load a network with sumolib (cached via _read_net_cached)"""
+        return sumolib.net.readNet(net_file)
+    
+    def _find_terminal_points(self, net_file: str, mtime: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Collect entry and exit points in a single pass over the network edges
+        
+        Edges without incoming connections are entry points (placed at their from
+        node), edges without outgoing connections are exit points (at their to node).
+        
+        Returns:
+            Tuple of (entry_points, exit_points)
+        """
+        net = self._read_net_cached(net_file, mtime)
+        
+        entry_points = []
+        exit_points = []
+        for edge in net.getEdges():
+            if not edge.getIncoming():
+                point = self._edge_point(edge, edge.getFromNode())
+                if point:
+                    entry_points.append(point)
+            if not edge.getOutgoing():
+                point = self._edge_point(edge, edge.getToNode())
+                if point:
+                    exit_points.append(point)
+        
+        return entry_points, exit_points
+    
+    def _edge_point(self, edge: Any, node: Any) -> Optional[Dict[str, Any]]:
+        """Build an entry/exit point for an edge located at one of its nodes"""
+        if node is None:
+            return None
+        
+        edge_id = edge.getID()
+        try:
+            x, y = node.getCoord()
+        except Exception as coord_error:
+            logger.warning(f"Could not get coordinates for edge {edge_id}: {coord_error}")
+            # Keep the point without coordinates
+            x, y = 0, 0
+        
+        return {
+            "id": edge_id,
+            "x": x,
+            "y": y,
+            "name": edge_id
+        }
+    
+    async def get_network_data(self, network_id: str, columnar: bool = False) -> Dict[str, Any]:
         """
         Get network data (nodes, edges, coordinates) for visualization
         
         Args:
             network_id: Unique network identifier
+            columnar: Return nodes and edges as field -> list columns instead of
+                lists of records (no repeated keys in the JSON payload)
             
         Returns:
             Dictionary containing network data for visualization
@@ -46,22 +267,16 @@ class MapService:
         try:
             logger.info(f"Getting network data for: {network_id}")
             
-            net_file = os.path.join(self.networks_dir, network_id, f"{network_id}.net.xml")
-            if not os.path.exists(net_file):
-                raise Exception("Network file not found")
-            
-            # Parse XML directly to extract network data
-            nodes, edges, bounds = await self._parse_network_xml(net_file, network_id)
-            
-            # Filter nodes and edges by bounding box if available
-            if bounds:
-                nodes, edges = self._filter_by_bounds(nodes, edges, bounds)
-            
-            # Calculate normalized bounds for visualization
-            bounds_dict = self._calculate_normalized_bounds(nodes)
+            net_file, mtime = self._network_file(network_id)
+            # Parsing is CPU-bound; keep it off the event loop
+            nodes, edges, bounds_dict = await asyncio.to_thread(self._load_network_cached, net_file, mtime)
             
             logger.info(f"Network data extracted: {len(nodes)} nodes, {len(edges)} edges")
             
+            if columnar:
+                nodes = {field: [node[field] for node in nodes] for field in NODE_FIELDS}
+                edges = {field: [edge[field] for edge in edges] for field in EDGE_FIELDS}
+            
             return {
                 "id": network_id,
                 "name": network_id,
@@ -76,7 +291,7 @@ class MapService:
             logger.error(f"Error getting network data for {network_id}: {e}")
             raise Exception(f"Error getting network data: {str(e)}")
     
-    async def _parse_network_xml(self, net_file: str, network_id: str) -> tuple:
+    def _parse_network_xml(self, net_file: str, network_id: str) -> tuple:
         """
         Parse SUMO network XML file to extract nodes and edges
         
@@ -85,87 +300,112 @@ class MapService:
             network_id: Network identifier for bounds extraction
             
         Returns:
-            Tuple of (nodes, edges, bounds)
+            Tuple of (node columns, edges, bounds); node columns map each node
+            field to a list (x/y to array('d') buffers)
         """
         try:
-            tree = ET.parse(net_file)
-            root = tree.getroot()
-            
-            # Extract nodes
-            nodes = []
+            # Nodes outside the bounding box (and edges touching them) are
+            # dropped while parsing, so they are never materialized
+            bounds = self._extract_bounds_from_id(network_id)
+            in_bbox = self._bbox_predicate(bounds) if bounds else None
+            
+            # Single streaming pass; edge attributes are buffered because edge
+            # shapes need every node's coordinates
+            # Nodes are collected column-wise: no per-node dict until the
+            # coordinates have been normalized
+            ids = []
+            types = []
+            xs = array.array('d')
+            ys = array.array('d')
+            lats = []
+            lons = []
             node_latlon_map = {}
-            
-            for node_elem in root.findall('.//node'):
-                node_data = self._parse_node_element(node_elem)
-                if node_data:
-                    nodes.append(node_data)
-                    if node_data.get('lat') and node_data.get('lon'):
-                        node_latlon_map[node_data['id']] = (node_data['lat'], node_data['lon'])
-            
-            # Extract edges
+            node_xy_map = {}
+            edge_attrs: List[Dict[str, str]] = []
+            outside = 0
+            
+            def on_node(attrib: Dict[str, str]) -> None:
+                nonlocal outside
+                node = self._parse_node_element(attrib)
+                if node is None:
+                    return
+                node_id, x, y, node_type, lat, lon = node
+                if in_bbox is not None and not in_bbox(lat, lon):
+                    outside += 1
+                    return
+                ids.append(node_id)
+                types.append(node_type)
+                xs.append(x)
+                ys.append(y)
+                lats.append(lat)
+                lons.append(lon)
+                node_xy_map[node_id] = (x, y)
+                if lat and lon:
+                    node_latlon_map[node_id] = (lat, lon)
+            
+            _parse_network_file(net_file, on_node, edge_attrs.append)
+            
+            # Extract edges; the bounding box usually matches the network's own
+            # extent, so edges only need clipping if a node actually fell outside
+            clip_edges = outside > 0
             edges = []
-            for edge_elem in root.findall('.//edge'):
-                edge_data = self._parse_edge_element(edge_elem, node_latlon_map, nodes)
+            for attrs in edge_attrs:
+                if clip_edges and (attrs.get('from') not in node_xy_map or attrs.get('to') not in node_xy_map):
+                    continue
+                edge_data = self._parse_edge_element(attrs, node_latlon_map, node_xy_map)
                 if edge_data:
                     edges.append(edge_data)
             
-            # Extract bounds from network_id
-            bounds = self._extract_bounds_from_id(network_id)
-            
-            return nodes, edges, bounds
+            columns = {"id": ids, "type": types, "x": xs, "y": ys, "lat": lats, "lon": lons}
+            return columns, edges, bounds
             
         except Exception as e:
             logger.error(f"Error parsing network XML: {e}")
             raise Exception(f"Error parsing network XML: {str(e)}")
     
-    def _parse_node_element(self, node_elem) -> Optional[Dict[str, Any]]:
-        """Parse a node XML element"""
+    def _parse_node_element(self, attrib: Dict[str, str]) -> Optional[tuple]:
+        """Parse the attributes of a node XML element into (id, x, y, type, lat, lon)"""
         try:
-            node_id = node_elem.get('id')
-            x_str = node_elem.get('x')
-            y_str = node_elem.get('y')
+            node_id = attrib.get('id')
+            x_str = attrib.get('x')
+            y_str = attrib.get('y')
             
-            if not all([node_id, x_str, y_str]):
+            if not (node_id and x_str and y_str):
                 logger.warning(f"Node {node_id} has missing coordinates, skipping")
                 return None
             
             x = float(x_str)
             y = float(y_str)
-            node_type = node_elem.get('type', 'priority')
-            lat = float(node_elem.get('lat')) if node_elem.get('lat') else None
-            lon = float(node_elem.get('lon')) if node_elem.get('lon') else None
+            node_type = attrib.get('type', 'priority')
+            lat_str = attrib.get('lat')
+            lon_str = attrib.get('lon')
+            lat = float(lat_str) if lat_str else None
+            lon = float(lon_str) if lon_str else None
             
-            return {
-                "id": node_id,
-                "x": x,
-                "y": y,
-                "type": node_type,
-                "lat": lat,
-                "lon": lon
-            }
+            return node_id, x, y, node_type, lat, lon
             
         except ValueError as e:
             logger.warning(f"Node {node_id} has invalid coordinates: {e}")
             return None
     
-    def _parse_edge_element(self, edge_elem, node_latlon_map: Dict, nodes: List[Dict]) -> Optional[Dict[str, Any]]:
-        """Parse an edge XML element"""
+    def _parse_edge_element(self, attrib: Dict[str, str], node_latlon_map: Dict, node_xy_map: Dict) -> Optional[Dict[str, Any]]:
+        """Parse the attributes of an edge XML element"""
         try:
-            edge_id = edge_elem.get('id')
-            from_node = edge_elem.get('from')
-            to_node = edge_elem.get('to')
+            edge_id = attrib.get('id')
+            from_node = attrib.get('from')
+            to_node = attrib.get('to')
             
-            if not all([edge_id, from_node, to_node]):
+            if not (edge_id and from_node and to_node):
                 logger.warning(f"Edge {edge_id} has missing attributes, skipping")
                 return None
             
             # Get edge properties
-            num_lanes = int(edge_elem.get('numLanes', '2'))
-            speed = float(edge_elem.get('speed', '13.89'))
-            length = float(edge_elem.get('length', '100'))
+            num_lanes = int(attrib.get('numLanes', '2'))
+            speed = float(attrib.get('speed', '13.89'))
+            length = float(attrib.get('length', '100'))
             
             # Calculate shape coordinates
-            shape_coords = self._calculate_edge_shape(from_node, to_node, node_latlon_map, nodes)
+            shape_coords = self._calculate_edge_shape(from_node, to_node, node_latlon_map, node_xy_map)
             if not shape_coords:
                 logger.warning(f"Edge {edge_id} has missing node coordinates, skipping")
                 return None
@@ -184,7 +424,7 @@ class MapService:
             logger.warning(f"Edge {edge_id} has invalid properties: {e}")
             return None
     
-    def _calculate_edge_shape(self, from_node: str, to_node: str, node_latlon_map: Dict, nodes: List[Dict]) -> Optional[List]:
+    def _calculate_edge_shape(self, from_node: str, to_node: str, node_latlon_map: Dict, node_xy_map: Dict) -> Optional[List]:
         """Calculate edge shape coordinates"""
         # Try to use lat/lon coordinates first
         from_coords = node_latlon_map.get(from_node)
@@ -193,9 +433,9 @@ class MapService:
         if from_coords and to_coords:
             return [from_coords, to_coords]
         
-        # Fallback to normalized x/y coordinates
-        from_xy = next((n['x'], n['y']) for n in nodes if n['id'] == from_node)
-        to_xy = next((n['x'], n['y']) for n in nodes if n['id'] == to_node)
+        # Fallback to x/y coordinates
+        from_xy = node_xy_map.get(from_node)
+        to_xy = node_xy_map.get(to_node)
         
         if from_xy and to_xy:
             return [from_xy, to_xy]
@@ -204,7 +444,7 @@ class MapService:
     
     def _extract_bounds_from_id(self, network_id: str) -> Optional[Dict[str, float]]:
         """Extract bounding box from network ID"""
-        m = re.match(r"map_([\d-]+)_([\d-]+)_([\d-]+)_([\d-]+)", network_id)
+        m = _NETWORK_ID_RE.match(network_id)
         if m:
             north = float(m.group(1)) / 1000
             south = float(m.group(2)) / 1000
@@ -219,44 +459,46 @@ class MapService:
             }
         return None
     
-    def _filter_by_bounds(self, nodes: List[Dict], edges: List[Dict], bounds: Dict[str, float]) -> tuple:
-        """Filter nodes and edges by bounding box"""
-        def in_bbox(node):
-            return (node.get('lon') is not None and node.get('lat') is not None and
-                    bounds['west'] <= node['lon'] <= bounds['east'] and
-                    bounds['south'] <= node['lat'] <= bounds['north'])
-        
-        filtered_nodes = [n for n in nodes if in_bbox(n)]
-        node_ids = set(n['id'] for n in filtered_nodes)
-        filtered_edges = [e for e in edges if e['from'] in node_ids and e['to'] in node_ids]
-        
-        return filtered_nodes, filtered_edges
+    def _bbox_predicate(self, bounds: Dict[str, float]) -> Callable[[Optional[float], Optional[float]], bool]:
+        """Return a predicate telling whether a node's (lat, lon) lies inside the bounding box"""
+        west, east = bounds['west'], bounds['east']
+        south, north = bounds['south'], bounds['north']
+        
+        def in_bbox(lat: Optional[float], lon: Optional[float]) -> bool:
+            return (lon is not None and lat is not None and
+                    west <= lon <= east and south <= lat <= north)
+        
+        return in_bbox
     
-    def _calculate_normalized_bounds(self, nodes: List[Dict]) -> Dict[str, float]:
-        """Calculate normalized bounds for visualization"""
-        if not nodes:
+    def _calculate_normalized_bounds(self, xs: array.array, ys: array.array) -> Dict[str, float]:
+        """Calculate normalized bounds for visualization, rescaling xs/ys in place"""
+        if not xs:
             return {"xmin": 0, "ymin": 0, "xmax": 0, "ymax": 0}
         
-        x_coords = [node["x"] for node in nodes]
-        y_coords = [node["y"] for node in nodes]
+        # Zero-copy NumPy views over the coordinate buffers
+        x = np.frombuffer(xs, dtype=np.float64)
+        y = np.frombuffer(ys, dtype=np.float64)
+        xmin, xmax = float(x.min()), float(x.max())
+        ymin, ymax = float(y.min()), float(y.max())
         
         bounds_dict = {
-            "xmin": min(x_coords),
-            "ymin": min(y_coords),
-            "xmax": max(x_coords),
-            "ymax": max(y_coords)
+            "xmin": xmin,
+            "ymin": ymin,
+            "xmax": xmax,
+            "ymax": ymax
         }
         
         # Normalize coordinates for better visualization
-        x_range = bounds_dict["xmax"] - bounds_dict["xmin"]
-        y_range = bounds_dict["ymax"] - bounds_dict["ymin"]
+        x_range = xmax - xmin
+        y_range = ymax - ymin
         
         if x_range > 0 and y_range > 0:
             scale_factor = min(200 / x_range, 200 / y_range)
-            
-            for node in nodes:
-                node["x"] = (node["x"] - bounds_dict["xmin"] - x_range / 2) * scale_factor
-                node["y"] = (node["y"] - bounds_dict["ymin"] - y_range / 2) * scale_factor
+            # In place, writing straight through to xs/ys
+            x -= xmin + x_range / 2
+            x *= scale_factor
+            y -= ymin + y_range / 2
+            y *= scale_factor
             
             bounds_dict = {"xmin": -100, "ymin": -100, "xmax": 100, "ymax": 100}
         
@@ -275,35 +517,8 @@ class MapService:
         try:
             logger.info(f"Getting entry points for: {network_id}")
             
-            net_file = os.path.join(self.networks_dir, network_id, f"{network_id}.net.xml")
-            if not os.path.exists(net_file):
-                raise Exception("Network file not found")
-            
-            net = sumolib.net.readNet(net_file)
-            
-            entry_points = []
-            for edge in net.getEdges():
-                # Consider edges with no incoming connections as entry points
-                if len(edge.getIncoming()) == 0:
-                    from_node = edge.getFromNode()
-                    if from_node is not None:
-                        try:
-                            x, y = from_node.getCoord()
-                            entry_points.append({
-                                "id": edge.getID(),
-                                "x": x,
-                                "y": y,
-                                "name": edge.getID()
-                            })
-                        except Exception as coord_error:
-                            logger.warning(f"Could not get coordinates for edge {edge.getID()}: {coord_error}")
-                            # Add entry point without coordinates
-                            entry_points.append({
-                                "id": edge.getID(),
-                                "x": 0,
-                                "y": 0,
-                                "name": edge.getID()
-                            })
+            net_file, mtime = self._network_file(network_id)
+            entry_points, _ = await asyncio.to_thread(self._terminal_points_cached, net_file, mtime)
             
             logger.info(f"Found {len(entry_points)} entry points")
             return entry_points
@@ -325,35 +540,8 @@ class MapService:
         try:
             logger.info(f"Getting exit points for: {network_id}")
             
-            net_file = os.path.join(self.networks_dir, network_id, f"{network_id}.net.xml")
-            if not os.path.exists(net_file):
-                raise Exception("Network file not found")
-            
-            net = sumolib.net.readNet(net_file)
-            
-            exit_points = []
-            for edge in net.getEdges():
-                # Consider edges with no outgoing connections as exit points
-                if len(edge.getOutgoing()) == 0:
-                    to_node = edge.getToNode()
-                    if to_node is not None:
-                        try:
-                            x, y = to_node.getCoord()
-                            exit_points.append({
-                                "id": edge.getID(),
-                                "x": x,
-                                "y": y,
-                                "name": edge.getID()
-                            })
-                        except Exception as coord_error:
-                            logger.warning(f"Could not get coordinates for edge {edge.getID()}: {coord_error}")
-                            # Add exit point without coordinates
-                            exit_points.append({
-                                "id": edge.getID(),
-                                "x": 0,
-                                "y": 0,
-                                "name": edge.getID()
-                            })
+            net_file, mtime = self._network_file(network_id)
+            _, exit_points = await asyncio.to_thread(self._terminal_points_cached, net_file, mtime)
             
             logger.info(f"Found {len(exit_points)} exit points")
             return exit_points
@@ -376,11 +564,8 @@ class MapService:
         try:
             logger.info(f"Configuring routes for network: {network_id}")
             
-            net_file = os.path.join(self.networks_dir, network_id, f"{network_id}.net.xml")
-            if not os.path.exists(net_file):
-                raise Exception("Network file not found")
-            
-            net = sumolib.net.readNet(net_file)
+            net_file, mtime = self._network_file(network_id)
+            net = await asyncio.to_thread(self._read_net_cached, net_file, mtime)
             
             # Create simulation directory
             sim_dir = os.path.join(self.simulations_dir, network_id)
@@ -411,30 +596,23 @@ class MapService:
     def _generate_route_file(self, net, routes: List[Dict[str, Any]], route_file: str):
         """Generate SUMO route file"""
         try:
+            parts = ['<?xml version="1.0" encoding="UTF-8"?>\n', '<routes>\n', ROUTE_FILE_VTYPES]
+            
+            # Routes, then vehicles
+            parts.extend(
+                ROUTE_TMPL % (i, route["from_edge"], route["to_edge"])
+                for i, route in enumerate(routes)
+            )
+            parts.extend(
+                VEHICLE_TMPL % (i, route.get("vehicle_type", "passenger"), i, route.get("depart_time", i * 2))
+                for i, route in enumerate(routes)
+            )
+            
+            parts.append('</routes>\n')
+            
+            # Single buffered write instead of one call per line
             with open(route_file, 'w', encoding='utf-8') as f:
-                f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-                f.write('<routes>\n')
-                
-                # Write vehicle types
-                f.write('  <vType id="passenger" accel="2.6" decel="4.5" sigma="0.5" length="5" minGap="2.5" maxSpeed="16.67" guiShape="passenger"/>\n')
-                f.write('  <vType id="bus" accel="1.2" decel="4.5" sigma="0.5" length="12" minGap="3" maxSpeed="13.89" guiShape="bus"/>\n')
-                f.write('  <vType id="truck" accel="1.3" decel="4.5" sigma="0.5" length="8" minGap="3" maxSpeed="11.11" guiShape="truck"/>\n')
-                
-                # Write routes
-                for i, route in enumerate(routes):
-                    route_id = f"route_{i}"
-                    f.write(f'  <route id="{route_id}" edges="{route["from"]} {route["to"]}"/>\n')
-                
-                # Write vehicles
-                for i, route in enumerate(routes):
-                    vehicle_id = f"vehicle_{i}"
-                    route_id = f"route_{i}"
-                    vehicle_type = route.get("vehicle_type", "passenger")
-                    depart_time = route.get("depart_time", i * 2)
-                    
-                    f.write(f'  <vehicle id="{vehicle_id}" type="{vehicle_type}" route="{route_id}" depart="{depart_time}"/>\n')
-                
-                f.write('</routes>\n')
+                f.writelines(parts)
             
             logger.info(f"Route file generated: {route_file}")
             
@@ -446,23 +624,7 @@ class MapService:
         """Generate SUMO configuration file"""
         try:
             with open(config_file, 'w', encoding='utf-8') as f:
-                f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-                f.write('<configuration>\n')
-                f.write('  <input>\n')
-                f.write(f'    <net-file value="{os.path.basename(net_file)}"/>\n')
-                f.write(f'    <route-files value="{os.path.basename(route_file)}"/>\n')
-                f.write('  </input>\n')
-                f.write('  <time>\n')
-                f.write('    <begin value="0"/>\n')
-                f.write('    <end value="3600"/>\n')
-                f.write('  </time>\n')
-                f.write('  <processing>\n')
-                f.write('    <time-to-teleport value="-1"/>\n')
-                f.write('  </processing>\n')
-                f.write('  <routing>\n')
-                f.write('    <device.rerouting.probability value="0.1"/>\n')
-                f.write('  </routing>\n')
-                f.write('</configuration>\n')
+                f.write(_CFG_TEMPLATE.format(net=os.path.basename(net_file), route=os.path.basename(route_file)))
             
             logger.info(f"Configuration file generated: {config_file}")
             
@@ -483,10 +645,7 @@ class MapService:
         try:
             logger.info(f"Exporting SUMO network: {network_id}")
             
-            net_file = os.path.join(self.networks_dir, network_id, f"{network_id}.net.xml")
-            if not os.path.exists(net_file):
-                raise Exception("Network file not found")
-            
+            net_file, _ = self._network_file(network_id)
             return net_file
             
         except Exception as e:
@@ -512,12 +671,7 @@ class MapService:
             
             # Create ZIP file
             zip_file = os.path.join(self.networks_dir, f"{network_id}_traci.zip")
-            with zipfile.ZipFile(zip_file, 'w') as zipf:
-                for root, dirs, files in os.walk(network_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, network_dir)
-                        zipf.write(file_path, arcname)
+            await asyncio.to_thread(self._write_network_zip, network_dir, zip_file)
             
             logger.info(f"TraCI-ready network exported: {zip_file}")
             return zip_file
@@ -526,6 +680,18 @@ class MapService:
             logger.error(f"Error exporting TraCI-ready network {network_id}: {e}")
             raise Exception(f"Error exporting TraCI-ready network: {str(e)}")
     
+    def _write_network_zip(self, network_dir: str, zip_file: str) -> None:
+        """Archive a network directory, reading files ahead in threads while the previous one is deflated"""
+        workers = min(4, os.cpu_count() or 1)
+        with zipfile.ZipFile(zip_file, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6, allowZip64=True) as zipf:
+            for file_path, data in _read_files_ahead(_iter_files(network_dir), workers):
+                # ZipInfo.from_file keeps the file's mtime and mode in the archive
+                zinfo = zipfile.ZipInfo.from_file(file_path, os.path.relpath(file_path, network_dir))
+                if file_path.lower().endswith(_COMPRESSED_SUFFIXES):
+                    zipf.writestr(zinfo, data, compress_type=zipfile.ZIP_STORED)
+                else:
+                    zipf.writestr(zinfo, data, compress_type=zipfile.ZIP_DEFLATED, compresslevel=6)
+    
     async def process_uploaded_network(self, file_path: str) -> Dict[str, Any]:
         """
         Process uploaded network file
@@ -556,8 +722,7 @@ class MapService:
             
             # Copy file to network directory
             dest_file = os.path.join(network_dir, filename)
-            with open(file_path, 'rb') as src, open(dest_file, 'wb') as dst:
-                dst.write(src.read())
+            shutil.copyfile(file_path, dest_file)
             
             logger.info(f"Uploaded network processed: {network_id}")
             
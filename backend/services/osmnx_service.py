@@ -5,21 +5,50 @@ Handles OSM data download, processing, and conversion to SUMO format
 
 import os
 import json
+import hashlib
 import asyncio
 import logging
 import tempfile
 import subprocess
 import shutil
-import signal
 import math
-from typing import Dict, Any, Optional
+import time
+import ast
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Any, NamedTuple, Optional, Set
 
+import numpy as np
+import pandas as pd
 import osmnx as ox
 import folium
+import shapely
 import sumolib
+from shapely.strtree import STRtree
+
+from config import get_config
+from services.file_cache import prune_cache_dir, touch_cache_entry
 
 logger = logging.getLogger(__name__)
 
+# GraphML attributes read when streaming a map straight to SUMO format
+GRAPHML_NODE_ATTRS = frozenset(('x', 'y', 'traffic_signals'))
+GRAPHML_EDGE_ATTRS = frozenset(('lanes', 'speed', 'length'))
+
+# Bump when _write_sumo_network output changes so cached conversions are not reused
+SUMO_CONVERSION_VERSION = "2"
+
+
+class NetworkWriteStats(NamedTuple):
+    """What _write_sumo_network produced, so validation need not re-read the file"""
+    node_count: int
+    edge_count: int
+    bytes_written: int
+
+
 class OSMNXService:
     """Service for handling OpenStreetMap data processing and SUMO conversion"""
     
@@ -27,6 +56,9 @@ class OSMNXService:
         """Initialize the OSMNX service with directories and configuration"""
         self.maps_dir = "static/maps"
         self.networks_dir = "static/networks"
+        # Converted networks by GraphML content hash; kept outside networks_dir
+        # so cache entries are never mistaken for network IDs
+        self.conversion_cache_dir = os.path.join("static", "cache", "sumo")
         
         # Create necessary directories
         os.makedirs(self.maps_dir, exist_ok=True)
@@ -35,9 +67,57 @@ class OSMNXService:
         # Configure OSMnx settings
         ox.settings.use_cache = True
         ox.settings.log_console = False
+        # Keep only the OSM tags the conversion reads (plus oneway/junction,
+        # which OSMnx needs to orient edges) so graphs and GraphML stay small
+        ox.settings.useful_tags_way = ['highway', 'lanes', 'maxspeed', 'oneway', 'junction']
+        ox.settings.useful_tags_node = ['highway']
+        # Bound each Overpass HTTP request so a download thread that outlived
+        # OSM_TIMEOUT (see _run_with_timeout) actually finishes. The setting is
+        # requests_timeout since OSMnx 2.0 and timeout before.
+        timeout_setting = 'requests_timeout' if hasattr(ox.settings, 'requests_timeout') else 'timeout'
+        setattr(ox.settings, timeout_setting, get_config().OSM_TIMEOUT)
+        
+        # Blocking OSMnx downloads run here so the event loop stays responsive
+        self._executor_workers = 4
+        self._executor = ThreadPoolExecutor(max_workers=self._executor_workers, thread_name_prefix="osmnx")
+        # Timed-out calls whose worker thread is still running
+        self._abandoned_calls: Set["concurrent.futures.Future[Any]"] = set()
+        
+        # Loaded GraphML graphs: map_id -> (mtime, graph), least recently used first
+        self._graph_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._graph_cache_size = 16
+        # Downloads in progress: cache file path -> task resolving to the graph
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
         
         logger.info("OSMNXService initialized")
     
+    def _load_graph(self, map_id: str) -> Any:
+        """
+        Load a map's GraphML file, reusing the cached graph while the file is unchanged
+        
+        Cached graphs are shared between requests and must not be mutated.
+        
+        Raises:
+            Exception: If the map file does not exist
+        """
+        graphml_file = os.path.join(self.maps_dir, f"{map_id}.graphml")
+        try:
+            mtime = os.stat(graphml_file).st_mtime_ns
+        except OSError:
+            raise Exception("Map not found")
+        
+        cached = self._graph_cache.get(map_id)
+        if cached is not None and cached[0] == mtime:
+            self._graph_cache.move_to_end(map_id)
+            return cached[1]
+        
+        G = ox.load_graphml(graphml_file)
+        self._graph_cache[map_id] = (mtime, G)
+        self._graph_cache.move_to_end(map_id)
+        if len(self._graph_cache) > self._graph_cache_size:
+            self._graph_cache.popitem(last=False)
+        return G
+    
     async def select_area(self, north: float, south: float, east: float, west: float, place_name: Optional[str] = None) -> Dict[str, Any]:
         """
         Select an area on the map and download OSM data
@@ -64,22 +144,23 @@ class OSMNXService:
                 raise Exception("Selected area is too large. Please select a smaller area (approximately 1km x 1km or less).")
             
             # Download roads including secondary streets and traffic lights
-            custom_filter = '["highway"~"motorway|trunk|primary|secondary|tertiary|residential|service"]'
+            custom_filter = get_config().OSM_CUSTOM_FILTER
             
-            # Download with timeout
-            G = await self._download_osm_data(north, south, east, west, custom_filter)
+            G = await self._fetch_graph(north, south, east, west, custom_filter)
             
             # Generate unique ID for this map
             map_id = f"map_{int(north*1000)}_{int(south*1000)}_{int(east*1000)}_{int(west*1000)}"
             
-            # Save OSM data as GraphML
+            # Save OSM data as GraphML and render the preview map concurrently:
+            # both only read G, so the file write overlaps the folium rendering
             graphml_file = os.path.join(self.maps_dir, f"{map_id}.graphml")
-            ox.save_graphml(G, graphml_file)
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(
+                loop.run_in_executor(self._executor, ox.save_graphml, G, graphml_file),
+                loop.run_in_executor(self._executor, self._create_preview_map_sync, G, map_id)
+            )
             logger.info(f"Saved GraphML file: {graphml_file}")
             
-            # Create preview map
-            preview_file = await self._create_preview_map(G, map_id)
-            
             # Get basic statistics
             node_count = len(G.nodes)
             edge_count = len(G.edges)
@@ -101,47 +182,110 @@ class OSMNXService:
             logger.error(f"Error selecting area: {e}")
             raise Exception(f"Error selecting area: {str(e)}")
     
+    async def _fetch_graph(self, north: float, south: float, east: float, west: float, custom_filter: str) -> Any:
+        """
+        Get the road graph for a bbox from the download cache or from Overpass
+        
+        Concurrent requests for the same bbox share one download. The download
+        runs as its own task, so a cancelled caller (e.g. a client that went
+        away) stops waiting without cancelling it for the others.
+        
+        Returns:
+            OSMnx graph object (shared between coalesced callers, treat as read-only)
+        """
+        cache_file = self._download_cache_file(north, south, east, west, custom_filter)
+        
+        task = self._inflight.get(cache_file)
+        if task is not None:
+            logger.info(f"Joining in-flight OSM download: {cache_file}")
+        else:
+            task = asyncio.ensure_future(self._load_or_download(cache_file, north, south, east, west, custom_filter))
+            self._inflight[cache_file] = task
+            task.add_done_callback(partial(self._download_done, cache_file))
+        return await asyncio.shield(task)
+    
+    def _download_done(self, cache_file: str, task: "asyncio.Task[Any]") -> None:
+        """Forget a finished shared download; its exception counts as retrieved if every caller left"""
+        if self._inflight.get(cache_file) is task:
+            del self._inflight[cache_file]
+        if not task.cancelled():
+            task.exception()
+    
+    async def _load_or_download(self, cache_file: str, north: float, south: float, east: float, west: float, custom_filter: str) -> Any:
+        """Load a recent download of exactly the same area and road filter, or download and cache it"""
+        config = get_config()
+        if self._download_cache_fresh(cache_file, config.OSM_DOWNLOAD_CACHE_TTL):
+            logger.info(f"Using cached OSM download: {cache_file}")
+            return await asyncio.to_thread(ox.load_graphml, cache_file)
+        
+        # Download with timeout
+        G = await self._download_osm_data(north, south, east, west, custom_filter)
+        await asyncio.to_thread(self._save_graph_atomic, G, cache_file)
+        await asyncio.to_thread(
+            prune_cache_dir, os.path.dirname(cache_file), ".graphml",
+            config.OSM_DOWNLOAD_CACHE_ENTRIES, config.OSM_DOWNLOAD_CACHE_TTL
+        )
+        return G
+    
+    def _download_cache_file(self, north: float, south: float, east: float, west: float, custom_filter: str) -> str:
+        """Path of the cached download for an exact bbox and road filter"""
+        key = f"{north!r},{south!r},{east!r},{west!r}|{custom_filter}"
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return os.path.join(self.maps_dir, "_ovp_cache", f"{digest}.graphml")
+    
+    def _download_cache_fresh(self, cache_file: str, max_age: int) -> bool:
+        """Whether a cached download exists and is younger than max_age seconds"""
+        try:
+            return time.time() - os.stat(cache_file).st_mtime < max_age
+        except OSError:
+            return False
+    
+    def _save_graph_atomic(self, G: Any, graphml_file: str) -> None:
+        """Save a graph as GraphML via a temporary file so readers never see a partial file"""
+        os.makedirs(os.path.dirname(graphml_file), exist_ok=True)
+        tmp_file = f"{graphml_file}.{os.getpid()}.tmp"
+        try:
+            ox.save_graphml(G, tmp_file)
+            os.replace(tmp_file, graphml_file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+    
+    async def _run_with_timeout(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a blocking call on the download executor, bounded by OSM_TIMEOUT seconds
+        
+        A thread cannot be interrupted: on timeout the caller gets TimeoutError
+        but the call keeps its executor worker until it returns (the OSMnx
+        request timeout set in __init__ bounds how long that takes). Calls
+        still running after their timeout are counted and logged, since once
+        every worker is held by one, later downloads queue behind them.
+        """
+        timeout = get_config().OSM_TIMEOUT
+        future = self._executor.submit(partial(func, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            if not future.done():
+                self._abandoned_calls.add(future)
+                future.add_done_callback(self._abandoned_call_done)
+                logger.warning(
+                    f"{func.__name__} timed out after {timeout}s and is still running; "
+                    f"{len(self._abandoned_calls)} of {self._executor_workers} download workers are busy with timed-out calls"
+                )
+            raise
+    
+    def _abandoned_call_done(self, future: "concurrent.futures.Future[Any]") -> None:
+        """Forget a timed-out call once its thread has returned (runs on that thread)"""
+        self._abandoned_calls.discard(future)
+        logger.info(f"Timed-out download call finished; {len(self._abandoned_calls)} still running")
+    
     async def _download_osm_data(self, north: float, south: float, east: float, west: float, custom_filter: str):
         """Download OSM data with timeout and error handling"""
-        def timeout_handler(signum, frame):
-            raise TimeoutError("Download timeout - please try a smaller area")
-        
         try:
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(30)
+            return await self._run_with_timeout(self._download_graph, north, south, east, west, custom_filter)
             
-            try:
-                # Download road network
-                G = ox.graph_from_bbox(
-                    north, south, east, west,
-                    custom_filter=custom_filter,
-                    simplify=True
-                )
-                
-                # Download traffic signals nodes
-                tags = {'highway': 'traffic_signals'}
-                traffic_signals = ox.geometries_from_bbox(north, south, east, west, tags)
-                
-                # Add traffic signal information to nodes
-                for node_id, data in G.nodes(data=True):
-                    # Check if this node has traffic signals nearby
-                    node_lat = data.get('y')
-                    node_lon = data.get('x')
-                    if node_lat and node_lon:
-                        # Look for traffic signals within 50 meters
-                        for signal_id, signal_data in traffic_signals.iterrows():
-                            signal_lat = signal_data.geometry.y
-                            signal_lon = signal_data.geometry.x
-                            distance = math.sqrt((node_lat - signal_lat)**2 + (node_lon - signal_lon)**2)
-                            if distance < 0.0005:  # Approximately 50 meters
-                                data['traffic_signals'] = True
-                                break
-                
-                return G
-            finally:
-                signal.alarm(0)
-                
-        except TimeoutError:
+        except asyncio.TimeoutError:
             raise Exception("Download timeout - please try a smaller area or check your internet connection")
         except Exception as osm_error:
             error_msg = str(osm_error).lower()
@@ -155,29 +299,74 @@ class OSMNXService:
             else:
                 raise Exception(f"Error downloading map data: {str(osm_error)}")
     
+    def _download_graph(self, north: float, south: float, east: float, west: float, custom_filter: str) -> Any:
+        """Download the road graph and flag traffic signals (blocking; runs on the executor)"""
+        # Download road network in a single Overpass request. It is fetched
+        # unsimplified so traffic signal nodes on the roads (highway=
+        # traffic_signals node tags) are still present; simplification
+        # would drop them as interstitial nodes
+        G = ox.graph_from_bbox(
+            north, south, east, west,
+            custom_filter=custom_filter,
+            simplify=False
+        )
+        
+        signal_coords = [
+            (data['x'], data['y'])
+            for _, data in G.nodes(data=True)
+            if data.get('highway') == 'traffic_signals'
+        ]
+        G = ox.simplify_graph(G)
+        
+        # Add traffic signal information to nodes
+        if signal_coords:
+            self._mark_traffic_signals(G, shapely.points(np.asarray(signal_coords)))
+        
+        return G
+    
+    def _mark_traffic_signals(self, G: Any, traffic_signals: np.ndarray, radius: float = 0.0005) -> None:
+        """
+        Flag graph nodes that have a traffic signal nearby
+        
+        Args:
+            G: OSMnx graph object
+            traffic_signals: Array of traffic signal geometries (lon/lat)
+            radius: Search radius in degrees (0.0005 is approximately 50 meters)
+        """
+        if len(traffic_signals) == 0:
+            return
+        
+        node_ids = []
+        coords = []
+        for node_id, data in G.nodes(data=True):
+            node_lat = data.get('y')
+            node_lon = data.get('x')
+            if node_lat and node_lon:
+                node_ids.append(node_id)
+                coords.append((node_lon, node_lat))
+        if not node_ids:
+            return
+        
+        # One bulk spatial-index query instead of comparing every node with every signal
+        tree = STRtree(traffic_signals)
+        hits, _ = tree.query(shapely.points(np.asarray(coords)), predicate='dwithin', distance=radius)
+        for i in np.unique(hits).tolist():
+            G.nodes[node_ids[i]]['traffic_signals'] = True
+    
     async def _download_osm_data_fallback(self, north: float, south: float, east: float, west: float):
         """Fallback download with broader filter"""
-        def timeout_handler(signum, frame):
-            raise TimeoutError("Download timeout")
-        
         try:
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(30)
+            return await self._run_with_timeout(
+                ox.graph_from_bbox,
+                north, south, east, west,
+                network_type='drive',
+                simplify=True
+            )
             
-            try:
-                G = ox.graph_from_bbox(
-                    north, south, east, west,
-                    network_type='drive',
-                    simplify=True
-                )
-                return G
-            finally:
-                signal.alarm(0)
-                
         except Exception as fallback_error:
             raise Exception("No roads found in the selected area. Try selecting a larger area or a different location with more roads.")
     
-    async def _create_preview_map(self, G, map_id: str) -> str:
+    def _create_preview_map_sync(self, G: Any, map_id: str) -> str:
         """
         Create a preview map using folium
         
@@ -228,17 +417,21 @@ class OSMNXService:
         if len(G.nodes) == 0:
             raise Exception("No nodes found in the selected area. Try selecting a different area with main roads.")
         
-        lats = [data['y'] for node, data in G.nodes(data=True) if 'y' in data]
-        lons = [data['x'] for node, data in G.nodes(data=True) if 'x' in data]
-        
-        if not lats or not lons:
+        coords = self._node_coords(G)
+        if len(coords) == 0:
             raise Exception("No valid coordinates found in the selected area. Try selecting a different area.")
         
-        center_lat = sum(lats) / len(lats)
-        center_lon = sum(lons) / len(lons)
+        center_lon, center_lat = coords.mean(axis=0).tolist()
         
         return center_lat, center_lon
     
+    def _node_coords(self, G: Any) -> np.ndarray:
+        """(N, 2) array of node (x, y) = (lon, lat) for nodes that have both, in one pass"""
+        return np.fromiter(
+            ((data['x'], data['y']) for _, data in G.nodes(data=True) if 'x' in data and 'y' in data),
+            dtype=np.dtype((np.float64, 2))
+        )
+    
     async def get_map_preview(self, map_id: str) -> Dict[str, Any]:
         """
         Get preview data for a specific map
@@ -252,12 +445,8 @@ class OSMNXService:
         try:
             logger.info(f"Getting map preview for: {map_id}")
             
-            graphml_file = os.path.join(self.maps_dir, f"{map_id}.graphml")
-            if not os.path.exists(graphml_file):
-                raise Exception("Map not found")
-            
             # Load the graph
-            G = ox.load_graphml(graphml_file)
+            G = self._load_graph(map_id)
             
             # Get bounds
             bounds = self._calculate_graph_bounds(G)
@@ -289,17 +478,18 @@ class OSMNXService:
         if len(G.nodes) == 0:
             raise Exception("No nodes found in the network")
         
-        lats = [data['y'] for node, data in G.nodes(data=True) if 'y' in data]
-        lons = [data['x'] for node, data in G.nodes(data=True) if 'x' in data]
-        
-        if not lats or not lons:
+        coords = self._node_coords(G)
+        if len(coords) == 0:
             raise Exception("No valid coordinates found in the network")
         
+        west, south = coords.min(axis=0).tolist()
+        east, north = coords.max(axis=0).tolist()
+        
         return {
-            "north": max(lats),
-            "south": min(lats),
-            "east": max(lons),
-            "west": min(lons)
+            "north": north,
+            "south": south,
+            "east": east,
+            "west": west
         }
     
     async def convert_to_sumo(self, map_id: str) -> Dict[str, Any]:
@@ -315,24 +505,40 @@ class OSMNXService:
         try:
             logger.info(f"Converting map to SUMO format: {map_id}")
             
-            graphml_file = os.path.join(self.maps_dir, f"{map_id}.graphml")
-            if not os.path.exists(graphml_file):
-                raise Exception("Map file not found")
+            # Converted networks are cached by GraphML content, so re-converting
+            # an unchanged map only copies the validated result. Entries are only
+            # published (os.replace) after validation passes
+            key = self._conversion_key(map_id)
+            cached_net = os.path.join(self.conversion_cache_dir, f"{key}.net.xml")
             
             # Create network directory
             network_dir = os.path.join(self.networks_dir, map_id)
             os.makedirs(network_dir, exist_ok=True)
-            
-            # Load the graph
-            G = ox.load_graphml(graphml_file)
-            
-            # Convert to SUMO format
             net_file = os.path.join(network_dir, f"{map_id}.net.xml")
-            self._create_sumo_network(G, net_file)
             
-            # Validate the generated network
-            if not self._validate_sumo_network(net_file):
-                raise Exception("Generated SUMO network is invalid")
+            try:
+                shutil.copyfile(cached_net, net_file)
+                touch_cache_entry(cached_net)
+                logger.info(f"Reusing cached SUMO conversion {key}")
+            except FileNotFoundError:
+                # Convert to SUMO format next to the cache entry, then publish it atomically.
+                # The GraphML is streamed directly; no networkx graph is built
+                os.makedirs(self.conversion_cache_dir, exist_ok=True)
+                graphml_file = os.path.join(self.maps_dir, f"{map_id}.graphml")
+                tmp_net = f"{cached_net}.{os.getpid()}.tmp"
+                try:
+                    stats = self._stream_graphml_to_sumo(graphml_file, tmp_net)
+                    
+                    # Validate the generated network against what was written
+                    if not self._validate_sumo_network(tmp_net, stats):
+                        raise Exception("Generated SUMO network is invalid")
+                    
+                    os.replace(tmp_net, cached_net)
+                finally:
+                    if os.path.exists(tmp_net):
+                        os.remove(tmp_net)
+                shutil.copyfile(cached_net, net_file)
+                prune_cache_dir(self.conversion_cache_dir, ".net.xml", get_config().SUMO_CONVERSION_CACHE_ENTRIES)
             
             logger.info(f"SUMO conversion completed successfully: {net_file}")
             
@@ -347,130 +553,184 @@ class OSMNXService:
             logger.error(f"Error converting map {map_id} to SUMO: {e}")
             raise Exception(f"Error converting to SUMO: {str(e)}")
     
-    def _create_sumo_network(self, G, net_file: str):
+    def _edge_column(self, edges: list, key: str, default: float) -> pd.Series:
+        """
+        Numeric edge attribute as a float Series
+        
+        List values (merged OSM ways) use their first entry; missing or
+        non-numeric values fall back to the default.
+        """
+        raw = [
+            (value[0] if value else None) if isinstance(value, list) else value
+            for value in (data.get(key, default) for _, _, data in edges)
+        ]
+        return pd.to_numeric(pd.Series(raw, dtype=object), errors='coerce').fillna(default).astype(np.float64)
+    
+    def _conversion_key(self, map_id: str) -> str:
+        """
+        Content hash of a map's GraphML file and the converter version
+        
+        Raises:
+            Exception: If the map file does not exist
+        """
+        graphml_file = os.path.join(self.maps_dir, f"{map_id}.graphml")
+        digest = hashlib.blake2b(SUMO_CONVERSION_VERSION.encode(), digest_size=16)
+        try:
+            with open(graphml_file, 'rb') as f:
+                while chunk := f.read(1024 * 1024):
+                    digest.update(chunk)
+        except OSError:
+            raise Exception("Map not found")
+        return digest.hexdigest()
+    
+    def _stream_graphml_to_sumo(self, graphml_file: str, net_file: str) -> NetworkWriteStats:
         """
-        Create SUMO network file from OSMnx graph
+        Create SUMO network file straight from a GraphML file
+        
+        Only the attributes the conversion reads are kept: the GraphML is
+        streamed with iterparse instead of building a networkx graph, and the
+        decoded nodes and edges are handed to _write_sumo_network.
         
         Args:
-            G: OSMnx graph object
+            graphml_file: OSMnx GraphML file path
             net_file: Output SUMO network file path
         """
         try:
-            # Validate that we have nodes and edges
-            if len(G.nodes) == 0:
-                raise Exception("No nodes found in the graph")
-            if len(G.edges) == 0:
-                raise Exception("No edges found in the graph")
-            
-            # Convert coordinates from longitude/latitude to local coordinates
-            # Find the center point to use as origin
-            all_x = [data.get('x', 0) for _, data in G.nodes(data=True) if 'x' in data]
-            all_y = [data.get('y', 0) for _, data in G.nodes(data=True) if 'y' in data]
-            
-            if not all_x or not all_y:
-                raise Exception("No valid coordinates found in graph")
-            
-            # Use the center as origin for local coordinates
-            center_x = sum(all_x) / len(all_x)
-            center_y = sum(all_y) / len(all_y)
-            
-            # Scale factor to convert degrees to meters (approximate)
-            # 1 degree latitude ≈ 111,000 meters
-            # 1 degree longitude ≈ 111,000 * cos(latitude) meters
-            lat_scale = 111000  # meters per degree latitude
-            lon_scale = 111000 * abs(math.cos(math.radians(center_y)))  # meters per degree longitude
-            
-            # Create SUMO network XML
-            with open(net_file, 'w', encoding='utf-8') as f:
-                f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-                f.write('<net version="1.16" junctionCornerDetail="5" limitTurnSpeed="5.50" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/net_file.xsd">\n')
-                
-                # Write nodes (junctions)
-                f.write('    <nodes>\n')
-                node_count = 0
-                for node_id, data in G.nodes(data=True):
-                    if 'x' in data and 'y' in data:
-                        # Convert to local coordinates
-                        local_x = (data["x"] - center_x) * lon_scale
-                        local_y = (data["y"] - center_y) * lat_scale
-                        # Round to 2 decimal places to avoid parsing issues
-                        local_x_rounded = round(local_x, 2)
-                        local_y_rounded = round(local_y, 2)
-                        # Save original lat/lon
-                        lat = data["y"]
-                        lon = data["x"]
-                        # Check if this node has traffic signals
-                        node_type = "traffic_light" if data.get('traffic_signals', False) else "priority"
-                        f.write(f'        <node id="{node_id}" x="{local_x_rounded}" y="{local_y_rounded}" lat="{lat}" lon="{lon}" type="{node_type}"/>' + "\n")
-                        node_count += 1
-                
-                if node_count == 0:
-                    raise Exception("No valid nodes with coordinates found")
-                    
-                f.write('    </nodes>\n')
-                
-                # Write edges
-                f.write('    <edges>\n')
-                edge_count = 0
-                edge_id_counter = 0
-                for u, v, data in G.edges(data=True):
-                    edge_id = f"edge_{edge_id_counter}_{u}_{v}"
-                    edge_id_counter += 1
-                    # Get default values with better defaults and handle list values
-                    lanes_raw = data.get('lanes', 2)
-                    if isinstance(lanes_raw, list):
-                        if lanes_raw and len(lanes_raw) > 0:
-                            try:
-                                lanes = max(1, int(lanes_raw[0]))
-                            except (ValueError, TypeError):
-                                lanes = 2
-                        else:
-                            lanes = 2
-                    else:
-                        try:
-                            lanes = max(1, int(lanes_raw))
-                        except (ValueError, TypeError):
-                            lanes = 2
-                    
-                    speed_raw = data.get('speed', 13.89)
-                    if isinstance(speed_raw, list):
-                        speed = max(5.56, float(speed_raw[0]) if speed_raw else 13.89)
-                    else:
-                        speed = max(5.56, float(speed_raw))
-                    
-                    length_raw = data.get('length', 100)
-                    if isinstance(length_raw, list):
-                        length = max(10, float(length_raw[0]) if length_raw else 100)
-                    else:
-                        length = max(10, float(length_raw))
-                    
-                    f.write(f'        <edge id="{edge_id}" from="{u}" to="{v}" numLanes="{lanes}" speed="{speed}" length="{length}"/>\n')
-                    edge_count += 1
-                
-                if edge_count == 0:
-                    raise Exception("No valid edges found")
-                    
-                f.write('    </edges>\n')
-                
-                # Skip connections section to avoid validation issues
-                # SUMO will auto-generate connections based on the network topology
-                connection_count = 0
-                
-                f.write('</net>\n')
-            
-            # Log some statistics
-            logger.info(f"Created SUMO network with {node_count} nodes, {edge_count} edges, {connection_count} connections")
+            node_keys: Dict[str, str] = {}
+            edge_keys: Dict[str, str] = {}
+            nodes = []
+            edges = []
+            
+            for _, elem in ET.iterparse(graphml_file, events=('end',)):
+                tag = elem.tag.rpartition('}')[2]
+                if tag == 'key':
+                    wanted = GRAPHML_NODE_ATTRS if elem.get('for') == 'node' else GRAPHML_EDGE_ATTRS
+                    if elem.get('attr.name') in wanted:
+                        keys = node_keys if elem.get('for') == 'node' else edge_keys
+                        keys[elem.get('id')] = elem.get('attr.name')
+                elif tag == 'node':
+                    nodes.append((elem.get('id'), self._graphml_data(elem, node_keys)))
+                elif tag == 'edge':
+                    edges.append((elem.get('source'), elem.get('target'), self._graphml_data(elem, edge_keys)))
+                else:
+                    continue
+                elem.clear()
+            
+            return self._write_sumo_network(nodes, edges, net_file)
             
         except Exception as e:
             logger.error(f"Error creating SUMO network: {e}")
             raise Exception(f"Error creating SUMO network: {str(e)}")
     
-    def _validate_sumo_network(self, net_file: str) -> bool:
+    def _graphml_data(self, elem: ET.Element, keys: Dict[str, str]) -> Dict[str, Any]:
+        """Decode the wanted <data> children of a GraphML node/edge the way ox.load_graphml does"""
+        data = {}
+        for child in elem:
+            name = keys.get(child.get('key', ''))
+            if name is None:
+                continue
+            value: Any = child.text or ''
+            if name in ('x', 'y', 'length'):
+                value = float(value)
+            elif value.startswith('[') and value.endswith(']'):
+                # OSMnx stores list attributes (merged ways) as their repr
+                try:
+                    value = ast.literal_eval(value)
+                except (ValueError, SyntaxError):
+                    pass
+            data[name] = value
+        return data
+    
+    def _write_sumo_network(self, nodes: list, edges: list, net_file: str) -> NetworkWriteStats:
         """
-        Validate generated SUMO network using sumolib
+        Write a SUMO network file from (node_id, data) and (u, v, data) lists
+        
+        Returns:
+            NetworkWriteStats with the node/edge counts and file size
+            
+        Raises:
+            Exception: If there are no usable nodes or edges
+        """
+        # Validate that we have nodes and edges
+        if len(nodes) == 0:
+            raise Exception("No nodes found in the graph")
+        if len(edges) == 0:
+            raise Exception("No edges found in the graph")
+        
+        # Convert coordinates from longitude/latitude to local coordinates
+        node_items = [(node_id, data) for node_id, data in nodes if 'x' in data and 'y' in data]
+        if not node_items:
+            raise Exception("No valid coordinates found in graph")
+        
+        # (N, 2) lon/lat array; the center is used as origin for local coordinates
+        lonlat = np.array([(data['x'], data['y']) for _, data in node_items], dtype=np.float64)
+        center_x, center_y = lonlat.mean(axis=0).tolist()
+        
+        # Scale factor to convert degrees to meters (approximate)
+        # 1 degree latitude ≈ 111,000 meters
+        # 1 degree longitude ≈ 111,000 * cos(latitude) meters
+        lat_scale = 111000  # meters per degree latitude
+        lon_scale = 111000 * abs(math.cos(math.radians(center_y)))  # meters per degree longitude
+        
+        # Project all nodes at once, rounded to 2 decimal places to avoid parsing issues
+        local_xy = np.round((lonlat - (center_x, center_y)) * (lon_scale, lat_scale), 2).tolist()
+        node_lines = [
+            f'        <node id="{node_id}" x="{x}" y="{y}" lat="{data["y"]}" lon="{data["x"]}" '
+            f'type="{"traffic_light" if data.get("traffic_signals", False) else "priority"}"/>\n'
+            for (node_id, data), (x, y) in zip(node_items, local_xy)
+        ]
+        node_count = len(node_lines)
+        
+        # Build edge lines; lanes/speed/length are normalized column-wise
+        lanes = self._edge_column(edges, 'lanes', 2).astype(np.int64).clip(lower=1).tolist()
+        speeds = self._edge_column(edges, 'speed', 13.89).clip(lower=5.56).tolist()
+        lengths = self._edge_column(edges, 'length', 100).clip(lower=10).tolist()
+        
+        edge_lines = [
+            f'        <edge id="edge_{i}_{u}_{v}" from="{u}" to="{v}" numLanes="{lane_count}" speed="{speed}" length="{length}"/>\n'
+            for i, ((u, v, _), lane_count, speed, length) in enumerate(zip(edges, lanes, speeds, lengths))
+        ]
+        edge_count = len(edge_lines)
+        if edge_count == 0:
+            raise Exception("No valid edges found")
+        
+        # Skip connections section to avoid validation issues
+        # SUMO will auto-generate connections based on the network topology
+        connection_count = 0
+        
+        # Create SUMO network XML: the whole document is assembled in memory
+        # and written with a single call
+        content = ''.join([
+            '<?xml version="1.0" encoding="UTF-8"?>\n',
+            '<net version="1.16" junctionCornerDetail="5" limitTurnSpeed="5.50" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/net_file.xsd">\n',
+            '    <nodes>\n',
+            *node_lines,
+            '    </nodes>\n',
+            '    <edges>\n',
+            *edge_lines,
+            '    </edges>\n',
+            '</net>\n'
+        ]).encode('utf-8')
+        with open(net_file, 'wb') as f:
+            f.write(content)
+        
+        # Log some statistics
+        logger.info(f"Created SUMO network with {node_count} nodes, {edge_count} edges, {connection_count} connections")
+        
+        return NetworkWriteStats(node_count, edge_count, len(content))
+    
+    def _validate_sumo_network(self, net_file: str, stats: Optional[NetworkWriteStats] = None) -> bool:
+        """
+        Validate generated SUMO network
+        
+        The file is streamed once to check it is well-formed, has a <net> root and
+        contains nodes and edges. When the write stats are passed, the file size
+        and the parsed node/edge counts must also match what the writer reported.
+        With STRICT_NETWORK_VALIDATION it is additionally loaded with sumolib.
         
         Args:
             net_file: Path to SUMO network file
+            stats: Stats returned by _write_sumo_network for this file
             
         Returns:
             True if network is valid, False otherwise
@@ -488,27 +748,50 @@ class OSMNXService:
             
             logger.info(f"Network file size: {file_size} bytes")
             
+            # A size mismatch means the file was truncated or changed after writing
+            if stats is not None and file_size != stats.bytes_written:
+                logger.error(f"Network file size {file_size} does not match {stats.bytes_written} bytes written")
+                return False
+            
             # Check if file has basic XML structure
             with open(net_file, 'r') as f:
                 first_line = f.readline().strip()
                 if not first_line.startswith('<?xml'):
                     logger.error(f"File does not start with XML declaration: {first_line}")
                     return False
-                
-                # Check for net tag
-                content = f.read()
-                if '<net' not in content:
-                    logger.error("No <net> tag found in file")
-                    return False
-                if '</net>' not in content:
-                    logger.error("No </net> tag found in file")
-                    return False
             
-            # Try to load with sumolib
-            logger.info("Attempting to load with sumolib...")
-            net = sumolib.net.readNet(net_file)
-            edge_count = len(net.getEdges())
-            node_count = len(net.getNodes())
+            # Stream the document: parse errors (e.g. a missing </net>) raise here,
+            # and elements are cleared as soon as they are counted
+            root_tag = None
+            node_count = 0
+            edge_count = 0
+            for event, elem in ET.iterparse(net_file, events=('start', 'end')):
+                if event == 'start':
+                    if root_tag is None:
+                        root_tag = elem.tag
+                    continue
+                if elem.tag == 'node' or elem.tag == 'junction':
+                    node_count += 1
+                elif elem.tag == 'edge':
+                    edge_count += 1
+                elem.clear()
+            
+            if root_tag != 'net':
+                logger.error("No <net> tag found in file")
+                return False
+            
+            if stats is not None and (node_count, edge_count) != (stats.node_count, stats.edge_count):
+                logger.error(
+                    f"Network file has {node_count} nodes and {edge_count} edges, "
+                    f"expected {stats.node_count} and {stats.edge_count}"
+                )
+                return False
+            
+            if get_config().STRICT_NETWORK_VALIDATION:
+                logger.info("Attempting to load with sumolib...")
+                net = sumolib.net.readNet(net_file)
+                edge_count = len(net.getEdges())
+                node_count = len(net.getNodes())
             
             logger.info(f"SUMO network validation: {edge_count} edges, {node_count} nodes")
             
@@ -540,23 +823,17 @@ class OSMNXService:
         try:
             logger.info(f"Getting network statistics for: {map_id}")
             
-            graphml_file = os.path.join(self.maps_dir, f"{map_id}.graphml")
-            if not os.path.exists(graphml_file):
-                raise Exception("Map not found")
-            
             # Load the graph
-            G = ox.load_graphml(graphml_file)
+            G = self._load_graph(map_id)
             
             # Calculate statistics
             node_count = len(G.nodes)
             edge_count = len(G.edges)
             
-            # Calculate total length
-            total_length = sum(data.get('length', 0) for u, v, data in G.edges(data=True))
-            
-            # Calculate average speed
-            speeds = [data.get('speed', 13.89) for u, v, data in G.edges(data=True)]
-            avg_speed = sum(speeds) / len(speeds) if speeds else 13.89
+            # Total length and average speed as vectorized reductions over the edge columns
+            edges = list(G.edges(data=True))
+            total_length = float(self._edge_column(edges, 'length', 0).to_numpy().sum())
+            avg_speed = float(self._edge_column(edges, 'speed', 13.89).to_numpy().mean()) if edges else 13.89
             
             return {
                 "id": map_id,
@@ -3,6 +3,15 @@ Simulation Service - Traffic Simulation Management
 Handles SUMO simulation configuration, execution, and monitoring
 
 This service is currently a skeleton for future implementation.
+
+Implementation notes for running and monitoring simulations:
+- Prefer libsumo (in-process, no socket) and fall back to TraCI with the
+  same API: `try: import libsumo as traci` / `except ImportError: import traci`.
+- Read per-vehicle state through subscriptions, not per-vehicle getters:
+  subscribe new vehicles once with traci.vehicle.subscribe(vid, [tc.VAR_SPEED,
+  tc.VAR_POSITION]) and read traci.vehicle.getAllSubscriptionResults() once
+  per step. Calling getSpeed/getPosition in a loop costs one round trip per
+  vehicle per step and does not scale with fleet size.
 """
 
 import os
@@ -19,7 +28,6 @@ class SimulationService:
     def __init__(self):
         """Initialize the Simulation service"""
         self.simulations_dir = "static/simulations"
-        os.makedirs(self.simulations_dir, exist_ok=True)
         
         logger.info("SimulationService initialized (skeleton mode)")
     
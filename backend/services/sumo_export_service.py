@@ -10,31 +10,264 @@ This service generates the same file format as simple_network_robust_gui.py:
 """
 
 import os
-import json
+import io
+import asyncio
+import hashlib
 import logging
+import tarfile
 import tempfile
+import threading
 import zipfile
 import time
 import random
 import math
-from typing import Dict, List, Any, Optional
-from pathlib import Path
-import heapq
+from collections import defaultdict
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from typing import Callable, Dict, List, Any, Optional, Sequence, Union
+from xml.sax.saxutils import escape
+
+import orjson
+import ormsgpack
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
 
+from config import get_config
 from models.schemas import VehicleDistribution
+from services.file_cache import prune_cache_dir, touch_cache_entry
 
 logger = logging.getLogger(__name__)
 
+# Bump when the export archive contents change so cached exports are not reused
+EXPORT_FORMAT_VERSION = "3"
+
+# Archives used within this many seconds are never pruned: their download URL
+# may just have been returned to a client
+EXPORT_PRUNE_GRACE = 300
+
+# Export entries below this many bytes are stored uncompressed; larger ones use fast deflate
+EXPORT_STORE_THRESHOLD = 64 * 1024
+EXPORT_COMPRESSLEVEL = 1
+
+# Archive formats export_simulation can write; tar.zst needs the zstandard package
+EXPORT_ARCHIVE_FORMATS = ("zip", "tar.zst")
+EXPORT_ZSTD_LEVEL = 3
+
+# Opening lines of the generated XML files; elements are appended one per line
+NODES_XML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<nodes xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/nodes_file.xsd">"""
+EDGES_XML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<edges xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/edges_file.xsd">"""
+ROUTES_XML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<routes xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/routes_file.xsd">"""
+
+TRAFFIC_LIGHTS_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<additional xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/additional_file.xsd">
+    <!-- Traffic lights will be auto-generated by SUMO netconvert -->
+</additional>"""
+
+# simulation.sumocfg; {additional_input} is empty or an <additional-files> line
+SUMOCFG_TMPL = """<?xml version="1.0" encoding="UTF-8"?>
+<configuration xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/sumoConfiguration.xsd">
+    <input>
+        <net-file value="{net_file}"/>
+        <route-files value="{route_file}"/>{additional_input}
+    </input>
+    <time>
+        <begin value="0"/>
+        <end value="{simulation_time}"/>
+    </time>
+    <processing>
+        <ignore-route-errors value="true"/>
+        <collision.action value="warn"/>
+    </processing>
+    <report>
+        <verbose value="true"/>
+        <no-step-log value="true"/>
+    </report>
+</configuration>"""
+ADDITIONAL_FILES_TMPL = """
+        <additional-files value="{additional_file}"/>"""
+
+# Vehicle types based on pinv01-25-traffic-sim.txt reference
+ROUTES_VTYPES = """    <vType id="car" accel="2.6" decel="4.5" sigma="0.5" length="5" minGap="2.5" maxSpeed="16.67" guiShape="passenger"/>
+    <vType id="motorcycle" accel="2.6" decel="4.5" sigma="0.5" length="2.5" minGap="1.5" maxSpeed="20.83" guiShape="motorcycle"/>
+    <vType id="bus" accel="1.2" decel="4.5" sigma="0.5" length="12" minGap="3" maxSpeed="13.89" guiShape="bus"/>
+    <vType id="truck" accel="1.3" decel="4.5" sigma="0.5" length="8" minGap="3" maxSpeed="11.11" guiShape="truck"/>"""
+
+# Per-element line templates for the routes file, filled with str.format
+ROUTE_TMPL = '    <route id="{id}" edges="{edges}"/>'
+VEHICLE_TMPL = '    <vehicle id="{id}" type="{type}" route="{route}" depart="{depart}" {attrs}/>'
+FLOW_TMPL = '    <flow id="flow_{route}" begin="{begin}" end="{end}" vehsPerHour="{count}" route="{route}" type="{type}" color="{color}"/>'
+
+# run_simulation.py shipped with exports; {simulation_name} is the only field
+RUN_SCRIPT_TMPL = '''#!/usr/bin/env python3
+"""
+Simulación de tráfico generada por SUMO Helper
+Archivo: {simulation_name}
+
+Para ejecutar esta simulación:
+1. Asegúrate de tener SUMO instalado: sudo apt-get install sumo sumo-tools sumo-gui sumo-doc
+2. Ejecuta: python3 run_simulation.py
+"""
+
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+def run_simulation():
+    # Get the directory where this script is located
+    script_dir = Path(__file__).parent.absolute()
+    
+    print(f"=== Simulación de Tráfico: {simulation_name} ===")
+    print(f"Directorio: {{script_dir}}")
+    print()
+    
+    # Check if SUMO is installed (PATH lookup, no process start)
+    sumo_gui = shutil.which("sumo-gui")
+    if sumo_gui is None:
+        print("ERROR: sumo-gui no está instalado o no está en el PATH")
+        print("Instala SUMO con: sudo apt-get install sumo sumo-tools sumo-gui sumo-doc")
+        return False
+    print(f"SUMO-GUI encontrado: {{sumo_gui}}")
+    
+    # Generate network with netconvert
+    print("\\nGenerando red con netconvert...")
+    netconvert_cmd = [
+        "netconvert",
+        "--node-files", "nodes.nod.xml",
+        "--edge-files", "edges.edg.xml",
+        "--output-file", "network.net.xml",
+        "--no-turnarounds",
+        "--tls.guess", "true"
+    ]
+    
+    result = subprocess.run(netconvert_cmd, cwd=script_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        print("❌ Error generando la red:")
+        print(result.stderr)
+        return False
+    
+    print("✅ Red generada: network.net.xml")
+    
+    # Start simulation
+    print("\\nIniciando simulación en SUMO-GUI...")
+    sumo_cmd = ["sumo-gui", "-c", "simulation.sumocfg", "--no-step-log", "true"]
+    subprocess.run(sumo_cmd, cwd=script_dir)
+    
+    return True
+
+if __name__ == "__main__":
+    run_simulation()
+'''
+
+# Static reconstruction guide embedded in every metadata file (read-only, shared)
+RECONSTRUCTION_INFO = {
+    "instructions": "Para reconstruir esta simulación:",
+    "steps": [
+        "1. Cargar el archivo simulation_metadata.json",
+        "2. Usar los datos de nodes y edges para recrear la red",
+        "3. Aplicar la configuración de simulación",
+        "4. Configurar los puntos de entrada y salida seleccionados",
+        "5. Aplicar la distribución de vehículos",
+        "6. Generar las rutas basadas en los datos de routes"
+    ],
+    "file_structure": {
+        "nodes.nod.xml": "Definición de nodos de la red",
+        "edges.edg.xml": "Definición de aristas de la red",
+        "routes.rou.xml": "Rutas y flujos de vehículos",
+        "simulation.sumocfg": "Configuración de la simulación",
+        "traffic_lights.add.xml": "Semáforos detectados",
+        "run_simulation.py": "Script para ejecutar la simulación",
+        "simulation_metadata.json": "Metadatos completos para reconstrucción",
+        "simulation_metadata.msgpack": "Metadatos completos en formato MessagePack"
+    }
+}
+
+_ATTR_ENTITIES = {'"': "&quot;"}
+
+# Keys every node record from MapService carries
+_NODE_KEYS = itemgetter('id', 'x', 'y', 'type')
+
+# Node and edge fields copied into the simulation metadata, in output order
+_META_NODE_KEYS = itemgetter('id', 'x', 'y', 'lat', 'lon', 'type')
+_META_EDGE_KEYS = itemgetter('id', 'from', 'to', 'shape', 'length', 'speed', 'lanes')
+
+# Vehicle distribution fields copied into the simulation metadata
+_VD_FIELDS = ('vehicle_type', 'percentage', 'color', 'period', 'attributes')
+_VD_ATTRS = attrgetter(*_VD_FIELDS)
+
+
+def _xml_attr(value: Any) -> str:
+    """Escape a value for use inside a double-quoted XML attribute"""
+    return escape(str(value), _ATTR_ENTITIES)
+
+
+# Types and colors repeat across thousands of rows; escape each distinct value once
+_xml_token = lru_cache(maxsize=256)(_xml_attr)
+
+
+# Built-in vType lines by id, in ROUTES_VTYPES order
+_BUILTIN_VTYPES = {
+    line.split('"', 2)[1]: line for line in ROUTES_VTYPES.splitlines()
+}
+
+
+@lru_cache(maxsize=64)
+def _build_vtypes(vehicle_types_json: str) -> str:
+    """
+    Build the <vType> lines: the built-in types followed by custom ones
+    
+    A custom type with the id of a built-in type replaces it, so routes using
+    the default ids always reference a defined vType.
+    
+    Args:
+        vehicle_types_json: Custom vehicle type dicts as key-sorted JSON (the cache key)
+        
+    Returns:
+        Newline-joined vType elements
+    """
+    custom: Dict[str, str] = {}
+    for vehicle_type in orjson.loads(vehicle_types_json):
+        # id first, then the remaining attributes in (already sorted) name order
+        attrs = [('id', vehicle_type.get('id'))] + [
+            (name, value) for name, value in vehicle_type.items()
+            if name != 'id' and value is not None
+        ]
+        custom[str(attrs[0][1])] = "    <vType " + " ".join(f'{name}="{_xml_attr(value)}"' for name, value in attrs) + "/>"
+    lines = [custom.pop(vtype_id, line) for vtype_id, line in _BUILTIN_VTYPES.items()]
+    lines.extend(custom.values())
+    return "\n".join(lines)
+
+
 class SUMOExportService:
     """Service for generating SUMO simulation files"""
     
     def __init__(self):
         """Initialize the SUMO Export service"""
         self.exports_dir = "static/exports"
-        os.makedirs(self.exports_dir, exist_ok=True)
+        # Created on first export (see _ensure_dir), not on every process start
+        self._dir_ready = False
+        
+        # Export archives are named by a hash of their inputs and never rewritten
+        # in place, so a path's size can be cached once it has been stat'ed
+        self._export_size_cached = lru_cache(maxsize=256)(os.path.getsize)
         
         logger.info("SUMOExportService initialized")
     
+    def _ensure_dir(self) -> None:
+        """Create the exports directory the first time it is needed"""
+        if not self._dir_ready:
+            os.makedirs(self.exports_dir, exist_ok=True)
+            self._dir_ready = True
+    
     def create_nodes_file(self, nodes: List[Dict[str, Any]]) -> str:
         """
         Create SUMO nodes file content
@@ -45,21 +278,20 @@ class SUMOExportService:
         Returns:
             XML content for nodes file
         """
-        nodes_content = """<?xml version="1.0" encoding="UTF-8"?>
-<nodes xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/nodes_file.xsd">"""
-        
-        for node in nodes:
-            node_id = node.get('id', 'unknown')
-            x = node.get('x', 0)
-            y = node.get('y', 0)
-            node_type = node.get('type', 'priority')
-            
-            nodes_content += f"""
-    <node id="{node_id}" x="{x}" y="{y}" type="{node_type}"/>"""
-        
-        nodes_content += """
-</nodes>"""
-        return nodes_content
+        # Network nodes always carry these keys; direct lookups are much cheaper
+        # than .get(), which is only needed for hand-built node dicts
+        try:
+            rows = list(map(_NODE_KEYS, nodes))
+        except KeyError:
+            rows = [
+                (node.get('id', 'unknown'), node.get('x', 0), node.get('y', 0), node.get('type', 'priority'))
+                for node in nodes
+            ]
+        body = [
+            f'    <node id="{_xml_attr(node_id)}" x="{x}" y="{y}" type="{_xml_token(node_type)}"/>'
+            for node_id, x, y, node_type in rows
+        ]
+        return "\n".join([NODES_XML_HEADER, *body, '</nodes>'])
     
     def create_edges_file(self, edges: List[Dict[str, Any]]) -> str:
         """
@@ -71,22 +303,29 @@ class SUMOExportService:
         Returns:
             XML content for edges file
         """
-        edges_content = """<?xml version="1.0" encoding="UTF-8"?>
-<edges xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/edges_file.xsd">"""
-        
-        for edge in edges:
-            edge_id = edge.get('id', 'unknown')
-            from_node = edge.get('from', 'unknown')
-            to_node = edge.get('to', 'unknown')
-            num_lanes = edge.get('numLanes', 1)
-            speed = edge.get('speed', 13.89)  # Default 50 km/h
-            
-            edges_content += f"""
-    <edge id="{edge_id}" from="{from_node}" to="{to_node}" numLanes="{num_lanes}" speed="{speed}"/>"""
-        
-        edges_content += """
-</edges>"""
-        return edges_content
+        # id/from/to are always present on network edges; numLanes and speed are optional
+        try:
+            rows = [
+                (edge['id'], edge['from'], edge['to'], edge.get('numLanes', 1), edge.get('speed', 13.89))
+                for edge in edges
+            ]
+        except KeyError:
+            rows = [
+                (
+                    edge.get('id', 'unknown'),
+                    edge.get('from', 'unknown'),
+                    edge.get('to', 'unknown'),
+                    edge.get('numLanes', 1),
+                    edge.get('speed', 13.89)  # Default 50 km/h
+                )
+                for edge in edges
+            ]
+        body = [
+            f'    <edge id="{_xml_attr(edge_id)}" from="{_xml_attr(from_node)}" to="{_xml_attr(to_node)}" '
+            f'numLanes="{num_lanes}" speed="{speed}"/>'
+            for edge_id, from_node, to_node, num_lanes, speed in rows
+        ]
+        return "\n".join([EDGES_XML_HEADER, *body, '</edges>'])
     
     def create_traffic_lights_file(self, nodes: List[Dict[str, Any]]) -> str:
         """
@@ -100,13 +339,8 @@ class SUMOExportService:
         """
         # For now, create an empty additional file since SUMO will auto-generate traffic lights
         # when using netconvert with the --tls.guess=true option
-        traffic_lights_content = """<?xml version="1.0" encoding="UTF-8"?>
-<additional xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/additional_file.xsd">
-    <!-- Traffic lights will be auto-generated by SUMO netconvert -->
-</additional>"""
-        
         logger.info("Generated empty traffic lights file - SUMO will auto-generate traffic lights")
-        return traffic_lights_content
+        return TRAFFIC_LIGHTS_XML
     
     def create_route_file(self, routes: List[Dict[str, Any]], vehicle_types: Optional[List[Dict[str, Any]]] = None) -> str:
         """
@@ -114,39 +348,40 @@ class SUMOExportService:
         
         Args:
             routes: List of route configurations
-            vehicle_types: List of vehicle type definitions
+            vehicle_types: Optional custom vehicle type definitions (attribute dicts with
+                an id), added to the built-in car/motorcycle/bus/truck types
             
         Returns:
             XML content for routes file
         """
-        route_content = """<?xml version="1.0" encoding="UTF-8"?>
-<routes xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/routes_file.xsd">"""
+        if vehicle_types:
+            # Canonical JSON key so the vType block is built once per distinct list
+            vtypes_xml = _build_vtypes(orjson.dumps(vehicle_types, option=orjson.OPT_SORT_KEYS).decode())
+        else:
+            vtypes_xml = ROUTES_VTYPES
         
-        # Add vehicle types based on pinv01-25-traffic-sim.txt reference
-        route_content += """
-    <vType id="car" accel="2.6" decel="4.5" sigma="0.5" length="5" minGap="2.5" maxSpeed="16.67" guiShape="passenger"/>
-    <vType id="motorcycle" accel="2.6" decel="4.5" sigma="0.5" length="2.5" minGap="1.5" maxSpeed="20.83" guiShape="motorcycle"/>
-    <vType id="bus" accel="1.2" decel="4.5" sigma="0.5" length="12" minGap="3" maxSpeed="13.89" guiShape="bus"/>
-    <vType id="truck" accel="1.3" decel="4.5" sigma="0.5" length="8" minGap="3" maxSpeed="11.11" guiShape="truck"/>"""
+        parts = [ROUTES_XML_HEADER, vtypes_xml]
+        append = parts.append
         
         # Sort routes by departure time to avoid warnings
         sorted_routes = sorted(routes, key=lambda x: x.get('start_time', 0))
         
         # Add routes and vehicles
-        for route in sorted_routes:
-            route_id = route.get('id', f'route_{len(routes)}')
+        for idx, route in enumerate(sorted_routes):
+            route_id = _xml_attr(route.get('id') or f'route_{idx}')
             edges = route.get('edges', '')
+            # Edge lists are written space-separated, as SUMO expects
+            edges = _xml_attr(' '.join(edges) if isinstance(edges, (list, tuple)) else edges)
             vehicle_count = route.get('vehicle_count', 1)
-            vehicle_type = route.get('vehicle_type', 'car')
+            vehicle_type = _xml_token(route.get('vehicle_type', 'car'))
             start_time = route.get('start_time', 0)
             end_time = route.get('end_time', 3600)
-            color = route.get('color', 'yellow')
+            color = _xml_token(route.get('color', 'yellow'))
             attributes = route.get('attributes', '')
-            vehicle_id = route.get('vehicle_id', f'vehicle_{route_id}')
+            vehicle_id = _xml_attr(route['vehicle_id']) if 'vehicle_id' in route else f'vehicle_{route_id}'
             
             # Add route
-            route_content += f"""
-    <route id="{route_id}" edges="{edges}"/>"""
+            append(ROUTE_TMPL.format(id=route_id, edges=edges))
             
             # Add individual vehicle or flow
             if vehicle_count == 1:
@@ -155,16 +390,13 @@ class SUMOExportService:
                 # Only include attributes that are valid for SUMO vehicles
                 if attributes and 'length' not in attributes:
                     vehicle_attrs += f' {attributes}'
-                route_content += f"""
-    <vehicle id="{vehicle_id}" type="{vehicle_type}" route="{route_id}" depart="{start_time}" {vehicle_attrs}/>"""
+                append(VEHICLE_TMPL.format(id=vehicle_id, type=vehicle_type, route=route_id, depart=start_time, attrs=vehicle_attrs))
             else:
                 # Flow of vehicles
-                route_content += f"""
-    <flow id="flow_{route_id}" begin="{start_time}" end="{end_time}" vehsPerHour="{vehicle_count}" route="{route_id}" type="{vehicle_type}" color="{color}"/>"""
+                append(FLOW_TMPL.format(route=route_id, begin=start_time, end=end_time, count=vehicle_count, type=vehicle_type, color=color))
         
-        route_content += """
-</routes>"""
-        return route_content
+        append('</routes>')
+        return "\n".join(parts)
     
     def create_sumo_config(self, net_file: str, route_file: str, additional_file: str = None, simulation_time: int = 200) -> str:
         """
@@ -181,35 +413,22 @@ class SUMOExportService:
         """
         # Handle additional file input safely
         if additional_file is not None and additional_file != "":
-            additional_input = f"""
-        <additional-files value="{additional_file}"/>"""
+            additional_input = ADDITIONAL_FILES_TMPL.format(additional_file=additional_file)
         else:
             additional_input = ""
         
-        config_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<configuration xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/sumoConfiguration.xsd">
-    <input>
-        <net-file value="{net_file}"/>
-        <route-files value="{route_file}"/>{additional_input}
-    </input>
-    <time>
-        <begin value="0"/>
-        <end value="{simulation_time}"/>
-    </time>
-    <processing>
-        <ignore-route-errors value="true"/>
-        <collision.action value="warn"/>
-    </processing>
-    <report>
-        <verbose value="true"/>
-        <no-step-log value="true"/>
-    </report>
-</configuration>"""
-        return config_content
+        return SUMOCFG_TMPL.format(
+            net_file=net_file,
+            route_file=route_file,
+            additional_input=additional_input,
+            simulation_time=simulation_time
+        )
     
-    def create_run_script(self, simulation_name: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def create_run_script(simulation_name: str) -> str:
         """
-        Create a Python script to run the simulation
+        Create a Python script to run the simulation (cached per name)
         
         Args:
             simulation_name: Name of the simulation
@@ -217,69 +436,7 @@ class SUMOExportService:
         Returns:
             Python script content
         """
-        script_content = f'''#!/usr/bin/env python3
-"""
-Simulación de tráfico generada por SUMO Helper
-Archivo: {simulation_name}
-
-Para ejecutar esta simulación:
-1. Asegúrate de tener SUMO instalado: sudo apt-get install sumo sumo-tools sumo-gui sumo-doc
-2. Ejecuta: python3 run_simulation.py
-"""
-
-import os
-import sys
-import subprocess
-import tempfile
-from pathlib import Path
-
-def run_simulation():
-    # Get the directory where this script is located
-    script_dir = Path(__file__).parent.absolute()
-    
-    print(f"=== Simulación de Tráfico: {simulation_name} ===")
-    print(f"Directorio: {{script_dir}}")
-    print()
-    
-    # Check if SUMO is installed
-    try:
-        result = subprocess.run(["sumo-gui", "--version"], check=True, capture_output=True, text=True)
-        print(f"SUMO-GUI encontrado: {{result.stdout.split()[1]}}")
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("ERROR: sumo-gui no está instalado o no está en el PATH")
-        print("Instala SUMO con: sudo apt-get install sumo sumo-tools sumo-gui sumo-doc")
-        return False
-    
-    # Generate network with netconvert
-    print("\\nGenerando red con netconvert...")
-    netconvert_cmd = [
-        "netconvert",
-        "--node-files", "nodes.nod.xml",
-        "--edge-files", "edges.edg.xml",
-        "--output-file", "network.net.xml",
-        "--no-turnarounds",
-        "--tls.guess", "true"
-    ]
-    
-    result = subprocess.run(netconvert_cmd, cwd=script_dir, capture_output=True, text=True)
-    if result.returncode != 0:
-        print("❌ Error generando la red:")
-        print(result.stderr)
-        return False
-    
-    print("✅ Red generada: network.net.xml")
-    
-    # Start simulation
-    print("\\nIniciando simulación en SUMO-GUI...")
-    sumo_cmd = ["sumo-gui", "-c", "simulation.sumocfg", "--no-step-log", "true"]
-    subprocess.run(sumo_cmd, cwd=script_dir)
-    
-    return True
-
-if __name__ == "__main__":
-    run_simulation()
-'''
-        return script_content
+        return RUN_SCRIPT_TMPL.format(simulation_name=simulation_name)
     
 
     
@@ -298,19 +455,46 @@ if __name__ == "__main__":
         - depart times are strictly increasing globally
         - only color is allowed as vehicle attribute
         - Dijkstra is used for valid routes
+        
+        Route generation is CPU-bound, so it runs in a worker thread to keep
+        the event loop responsive.
         """
+        return await asyncio.to_thread(
+            self._generate_routes_with_vehicles_sync,
+            network_data,
+            total_vehicles,
+            vehicle_distribution,
+            entry_points,
+            exit_points,
+            simulation_time,
+            random_seed
+        )
+    
+    def _generate_routes_with_vehicles_sync(
+        self,
+        network_data: Dict[str, Any],
+        total_vehicles: int,
+        vehicle_distribution: List[VehicleDistribution],
+        entry_points: List[str],
+        exit_points: List[str],
+        simulation_time: int,
+        random_seed: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Synchronous implementation of generate_routes_with_vehicles"""
         try:
-            if random_seed is not None:
-                random.seed(random_seed)
+            # Private RNG so concurrent requests don't share the global seed
+            rng = random.Random(random_seed)
             total_percentage = sum(vd.percentage for vd in vehicle_distribution)
             if abs(total_percentage - 100.0) > 0.01:
                 raise Exception(f"Vehicle distribution percentages must sum to 100%, got {total_percentage}%")
-            vehicle_counts = {}
+            # First config per vehicle type, matching the previous next(...) lookup
+            vd_by_type: Dict[str, VehicleDistribution] = {}
             for vd in vehicle_distribution:
-                vehicle_type = vd.vehicle_type
-                percentage = vd.percentage
-                count = int((percentage / 100.0) * total_vehicles)
-                vehicle_counts[vehicle_type] = count
+                vd_by_type.setdefault(vd.vehicle_type, vd)
+            vehicle_counts = {
+                vd.vehicle_type: int((vd.percentage / 100.0) * total_vehicles)
+                for vd in vehicle_distribution
+            }
             actual_total = sum(vehicle_counts.values())
             if actual_total < total_vehicles:
                 first_type = vehicle_distribution[0].vehicle_type
@@ -318,58 +502,88 @@ if __name__ == "__main__":
             logger.info(f"Vehicle distribution: {vehicle_counts}")
             # Build graph for Dijkstra
             edges = network_data.get('edges', [])
-            graph = {}
+            graph = defaultdict(list)
             for edge in edges:
-                from_node = edge.get('from')
-                to_node = edge.get('to')
-                edge_id = edge.get('id')
-                if from_node not in graph:
-                    graph[from_node] = []
-                graph[from_node].append((to_node, edge_id))
-            # Dijkstra shortest path
-            def dijkstra(start, goal):
-                queue = [(0, start, [])]
-                visited = set()
-                while queue:
-                    cost, node, path = heapq.heappop(queue)
-                    if node == goal:
-                        return path
-                    if node in visited:
-                        continue
-                    visited.add(node)
-                    for neighbor, edge_id in graph.get(node, []):
-                        if neighbor not in visited:
-                            heapq.heappush(queue, (cost+1, neighbor, path + [edge_id]))
-                return None
+                graph[edge.get('from')].append((edge.get('to'), edge.get('id')))
+            # Unit edge costs, so one breadth-first sweep per entry point finds the
+            # shortest path to every exit. Each layer is ranked by (parent rank,
+            # edge id), which keeps the lexicographically smallest path the former
+            # heap-based search returned, so seeded runs produce the same routes.
+            def shortest_path_tree(start: str) -> Dict[str, Any]:
+                parent: Dict[str, Any] = {start: None}
+                layer = [start]
+                rank = {start: 0}
+                while layer:
+                    best: Dict[str, Any] = {}
+                    for node in layer:
+                        node_rank = rank[node]
+                        for neighbor, edge_id in graph.get(node, ()):
+                            if neighbor in parent:
+                                continue
+                            key = (node_rank, edge_id)
+                            current = best.get(neighbor)
+                            if current is None or key < current[0]:
+                                best[neighbor] = (key, node, edge_id)
+                    layer = sorted(best, key=lambda n: best[n][0])
+                    rank = {}
+                    for idx, node in enumerate(layer):
+                        rank[node] = idx
+                        parent[node] = best[node][1:]
+                return parent
+            def path_edges(tree: Dict[str, Any], goal: str) -> Optional[List[str]]:
+                if goal not in tree:
+                    return None
+                path = []
+                link = tree[goal]
+                while link is not None:
+                    node, edge_id = link
+                    path.append(edge_id)
+                    link = tree[node]
+                path.reverse()
+                return path
+            trees: Dict[str, Dict[str, Any]] = {}
+            # Edge strings per (entry, exit) pair: only |entries| x |exits| distinct
+            # searches exist, so each pair is solved once on first use
+            route_edges: Dict[tuple, Optional[str]] = {}
             # Generate routes
-            routes_data = []
+            routes_data: List[Dict[str, Any]] = []
+            append_route = routes_data.append
+            choice = rng.choice
             vehicle_id_counter = 0
             global_depart = 0.0
             depart_step = simulation_time / max(1, total_vehicles)
             for vehicle_type, count in vehicle_counts.items():
                 if count == 0:
                     continue
-                vd_config = next((vd for vd in vehicle_distribution if vd.vehicle_type == vehicle_type), None)
+                vd_config = vd_by_type.get(vehicle_type)
                 if not vd_config:
                     continue
-                for i in range(count):
-                    entry_point = random.choice(entry_points)
-                    closest_exit = random.choice(exit_points)
-                    # Find valid path using Dijkstra
-                    route_path = dijkstra(entry_point, closest_exit)
-                    if not route_path:
+                color = vd_config.color
+                for _ in range(count):
+                    entry_point = choice(entry_points)
+                    closest_exit = choice(exit_points)
+                    # Shortest path from the entry's tree (memoized per pair)
+                    key = (entry_point, closest_exit)
+                    if key in route_edges:
+                        edges_str = route_edges[key]
+                    else:
+                        tree = trees.get(entry_point)
+                        if tree is None:
+                            tree = trees[entry_point] = shortest_path_tree(entry_point)
+                        route_path = path_edges(tree, closest_exit)
+                        edges_str = route_edges[key] = " ".join(route_path) if route_path else None
+                    if not edges_str:
                         continue
                     depart_time = global_depart
                     global_depart += depart_step
-                    route_id = f"route_{vehicle_type}_{vehicle_id_counter}"
-                    routes_data.append({
-                        "id": route_id,
-                        "edges": " ".join(route_path),
+                    append_route({
+                        "id": f"route_{vehicle_type}_{vehicle_id_counter}",
+                        "edges": edges_str,
                         "vehicle_count": 1,
                         "vehicle_type": vehicle_type,
                         "start_time": depart_time,
                         "end_time": depart_time + 1,
-                        "color": vd_config.color,
+                        "color": color,
                         "attributes": "",  # Only color allowed
                         "vehicle_id": f"{vehicle_type}_{vehicle_id_counter}"
                     })
@@ -380,103 +594,21 @@ if __name__ == "__main__":
             logger.error(f"Error generating routes with vehicles: {e}")
             raise Exception(f"Error generating routes: {str(e)}")
     
-    def _find_closest_exit_point(
-        self, 
-        network_data: Dict[str, Any], 
-        entry_point: str, 
-        exit_points: List[str]
-    ) -> Optional[str]:
-        """Find the closest exit point to a given entry point"""
-        try:
-            # For now, use simple random selection
-            # TODO: Implement actual distance calculation using network topology
-            return random.choice(exit_points)
-        except Exception as e:
-            logger.warning(f"Error finding closest exit point: {e}")
-            return None
-    
-    def _calculate_route_path(
-        self, 
-        network_data: Dict[str, Any], 
-        entry_point: str, 
-        exit_point: str
-    ) -> Optional[List[str]]:
-        """Calculate route path from entry to exit point using real edge IDs"""
-        try:
-            edges = network_data.get('edges', [])
-            
-            # Create a mapping from node pairs to edge IDs
-            edge_mapping = {}
-            for edge in edges:
-                edge_id = edge.get('id', '')
-                from_node = edge.get('from', '')
-                to_node = edge.get('to', '')
-                
-                # Store both directions
-                edge_mapping[(from_node, to_node)] = edge_id
-                # Also store reverse direction if it's a bidirectional edge
-                if edge.get('bidirectional', False):
-                    edge_mapping[(to_node, from_node)] = edge_id
-            
-            # Try to find a direct edge from entry to exit
-            direct_edge = edge_mapping.get((entry_point, exit_point))
-            if direct_edge:
-                return [direct_edge]
-            
-            # If no direct edge, try to find a path through intermediate nodes
-            # For now, use a simple approach: find any edge that starts from entry_point
-            # and any edge that ends at exit_point, then connect them
-            entry_edges = []
-            exit_edges = []
-            
-            for edge in edges:
-                edge_id = edge.get('id', '')
-                from_node = edge.get('from', '')
-                to_node = edge.get('to', '')
-                
-                if from_node == entry_point:
-                    entry_edges.append((edge_id, to_node))
-                if to_node == exit_point:
-                    exit_edges.append((edge_id, from_node))
-            
-            # If we have both entry and exit edges, try to find a connection
-            if entry_edges and exit_edges:
-                # Pick a random entry edge and a random exit edge
-                entry_edge_id, entry_to_node = random.choice(entry_edges)
-                exit_edge_id, exit_from_node = random.choice(exit_edges)
-                
-                # If they connect through the same intermediate node, great!
-                if entry_to_node == exit_from_node:
-                    return [entry_edge_id, exit_edge_id]
-                
-                # Otherwise, try to find a connecting edge
-                connecting_edge = edge_mapping.get((entry_to_node, exit_from_node))
-                if connecting_edge:
-                    return [entry_edge_id, connecting_edge, exit_edge_id]
-                
-                # If no direct connection, just use the entry and exit edges
-                # (this might create an invalid route, but it's better than nothing)
-                return [entry_edge_id, exit_edge_id]
-            
-            # If we can't find a proper path, return None
-            logger.warning(f"Could not find valid route from {entry_point} to {exit_point}")
-            return None
-            
-        except Exception as e:
-            logger.warning(f"Error calculating route path: {e}")
-            return None
-    
     async def export_simulation(
         self, 
         network_data: Dict[str, Any], 
         routes: List[Dict[str, Any]], 
         simulation_config: Dict[str, Any],
-        selected_entry_points: List[str] = None,
-        selected_exit_points: List[str] = None,
-        vehicle_distribution: List[Dict[str, Any]] = None
+        selected_entry_points: Optional[List[str]] = None,
+        selected_exit_points: Optional[List[str]] = None,
+        vehicle_distribution: Optional[List[VehicleDistribution]] = None,
+        archive_format: str = "zip"
     ) -> str:
         """
-        Export simulation as a ZIP file with all necessary SUMO files and metadata JSON
+        Export simulation as an archive with all necessary SUMO files and metadata JSON
+        
+        XML generation and compression are CPU and disk bound, so the
+        export runs in a worker thread to keep the event loop responsive.
         
         Args:
             network_data: Network data with nodes and edges
@@ -485,14 +617,49 @@ if __name__ == "__main__":
             selected_entry_points: List of selected entry point IDs
             selected_exit_points: List of selected exit point IDs
             vehicle_distribution: Vehicle distribution configuration
+            archive_format: "zip" (default) or "tar.zst" (smaller and faster for large exports)
             
         Returns:
-            Path to the generated ZIP file
+            Path to the generated archive
         """
+        return await asyncio.to_thread(
+            self._export_simulation_sync,
+            network_data,
+            routes,
+            simulation_config,
+            selected_entry_points,
+            selected_exit_points,
+            vehicle_distribution,
+            archive_format
+        )
+    
+    def _export_simulation_sync(
+        self, 
+        network_data: Dict[str, Any], 
+        routes: List[Dict[str, Any]], 
+        simulation_config: Dict[str, Any],
+        selected_entry_points: Optional[List[str]] = None,
+        selected_exit_points: Optional[List[str]] = None,
+        vehicle_distribution: Optional[List[VehicleDistribution]] = None,
+        archive_format: str = "zip"
+    ) -> str:
+        """Synchronous implementation of export_simulation"""
         try:
-            # Create temporary directory for file generation
-            temp_dir = tempfile.mkdtemp(prefix="sumo_export_")
-            logger.info(f"Created temporary directory: {temp_dir}")
+            if archive_format not in EXPORT_ARCHIVE_FORMATS:
+                raise Exception(f"Unsupported archive format: {archive_format}")
+            if archive_format == "tar.zst" and not HAS_ZSTD:
+                raise Exception("tar.zst exports require the zstandard package")
+            
+            # Identical exports reuse the archive built the first time
+            digest = self._export_key(
+                network_data, routes, simulation_config,
+                selected_entry_points, selected_exit_points, vehicle_distribution
+            )
+            archive_path = os.path.join(self.exports_dir, f"simulation_{digest}.{archive_format}")
+            if os.path.exists(archive_path):
+                touch_cache_entry(archive_path)
+                logger.info(f"Reusing exported archive: {archive_path}")
+                return archive_path
             
             # Extract data
             nodes = network_data.get('nodes', [])
@@ -500,16 +667,8 @@ if __name__ == "__main__":
             simulation_time = simulation_config.get('simulation_time', 200)
             simulation_name = simulation_config.get('name', 'simulation')
             
-            # Generate SUMO files
-            nodes_content = self.create_nodes_file(nodes)
-            edges_content = self.create_edges_file(edges)
-            traffic_lights_content = self.create_traffic_lights_file(nodes)
-            route_content = self.create_route_file(routes)
-            config_content = self.create_sumo_config("network.net.xml", "routes.rou.xml", "traffic_lights.add.xml", simulation_time)
-            run_script = self.create_run_script(simulation_name)
-            
-            # Generate metadata JSON
-            metadata_json = self.create_simulation_metadata_json(
+            # Generate metadata once; written as JSON (human readable) and MessagePack (fast reload)
+            metadata = self.build_simulation_metadata(
                 network_data=network_data,
                 routes=routes,
                 simulation_config=simulation_config,
@@ -517,45 +676,130 @@ if __name__ == "__main__":
                 selected_exit_points=selected_exit_points or [],
                 vehicle_distribution=vehicle_distribution or []
             )
+            # Archives are reused for identical exports, so they carry no creation
+            # time that would only be true for the first of them
+            metadata["simulation_info"].pop("created_at", None)
             
-            # Write files to temporary directory
-            files_to_create = [
-                ("nodes.nod.xml", nodes_content),
-                ("edges.edg.xml", edges_content),
-                ("traffic_lights.add.xml", traffic_lights_content),
-                ("routes.rou.xml", route_content),
-                ("simulation.sumocfg", config_content),
-                ("run_simulation.py", run_script),
-                ("simulation_metadata.json", metadata_json)
+            # Archive entries are generated one at a time while writing the archive,
+            # so only the file being written is held in memory
+            files_to_create = self._sumo_file_entries(nodes, edges, routes, simulation_time) + [
+                ("run_simulation.py", lambda: self.create_run_script(simulation_name)),
+                ("simulation_metadata.json", lambda: orjson.dumps(metadata, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)),
+                ("simulation_metadata.msgpack", lambda: ormsgpack.packb(metadata))
             ]
             
-            for filename, content in files_to_create:
-                file_path = os.path.join(temp_dir, filename)
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                logger.info(f"Created file: {filename}")
-            
-            # Create ZIP file
-            zip_filename = f"simulation_{int(time.time())}.zip"
-            zip_path = os.path.join(self.exports_dir, zip_filename)
-            
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for filename, _ in files_to_create:
-                    file_path = os.path.join(temp_dir, filename)
-                    zipf.write(file_path, filename)
+            # Write under a temporary name so a concurrent identical export
+            # never sees a half-written archive
+            self._ensure_dir()
+            tmp_path = f"{archive_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                if archive_format == "tar.zst":
+                    self._write_tar_zst(tmp_path, files_to_create)
+                else:
+                    self._write_zip(tmp_path, files_to_create)
+                os.replace(tmp_path, archive_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
             
-            logger.info(f"Created ZIP file: {zip_path}")
+            logger.info(f"Created {archive_format} archive: {archive_path}")
             
-            # Clean up temporary directory
-            import shutil
-            shutil.rmtree(temp_dir)
+            # Keep only the most recently used archives; a regenerated archive can
+            # differ in size (timestamps), so forget cached sizes when pruning
+            suffixes = tuple(f".{fmt}" for fmt in EXPORT_ARCHIVE_FORMATS)
+            if prune_cache_dir(self.exports_dir, suffixes, get_config().EXPORT_CACHE_ENTRIES, min_age=EXPORT_PRUNE_GRACE):
+                self._export_size_cached.cache_clear()
             
-            return zip_path
+            return archive_path
             
         except Exception as e:
             logger.error(f"Error exporting simulation: {e}")
             raise Exception(f"Export error: {str(e)}")
     
+    def _sumo_file_entries(
+        self,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]],
+        routes: List[Dict[str, Any]],
+        simulation_time: int
+    ) -> list:
+        """
+        (filename, generate) pairs for the SUMO input files shared by exports and GUI runs
+        
+        Contents are produced only when generate() is called, so callers can
+        write each file before building the next one.
+        """
+        return [
+            ("nodes.nod.xml", lambda: self.create_nodes_file(nodes)),
+            ("edges.edg.xml", lambda: self.create_edges_file(edges)),
+            ("traffic_lights.add.xml", lambda: self.create_traffic_lights_file(nodes)),
+            ("routes.rou.xml", lambda: self.create_route_file(routes)),
+            ("simulation.sumocfg", lambda: self.create_sumo_config("network.net.xml", "routes.rou.xml", "traffic_lights.add.xml", simulation_time))
+        ]
+    
+    def _encode_entry(self, generate: Callable[[], Union[str, bytes]]) -> bytes:
+        """Generate one archive entry and return it as UTF-8 bytes"""
+        data = generate()
+        return data.encode('utf-8') if isinstance(data, str) else data
+    
+    def _write_zip(self, path: str, files_to_create: list) -> None:
+        """Write (name, generate) entries to a ZIP file"""
+        date_time = time.localtime()[:6]
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=EXPORT_COMPRESSLEVEL) as zipf:
+            for filename, generate in files_to_create:
+                data = self._encode_entry(generate)
+                # Deflating a small file costs more CPU than the bytes it saves
+                compress_type = zipfile.ZIP_STORED if len(data) < EXPORT_STORE_THRESHOLD else zipfile.ZIP_DEFLATED
+                zipf.writestr(self._zip_entry(filename, date_time), data,
+                              compress_type=compress_type, compresslevel=EXPORT_COMPRESSLEVEL)
+                del data
+    
+    def _write_tar_zst(self, path: str, files_to_create: list) -> None:
+        """Write (name, generate) entries to a Zstandard-compressed tar stream"""
+        mtime = time.time()
+        compressor = zstandard.ZstdCompressor(level=EXPORT_ZSTD_LEVEL, threads=-1)
+        with open(path, 'wb') as f, compressor.stream_writer(f, closefd=False) as stream, \
+                tarfile.open(fileobj=stream, mode='w|') as tar:
+            for filename, generate in files_to_create:
+                data = self._encode_entry(generate)
+                info = tarfile.TarInfo(filename)
+                info.size = len(data)
+                info.mtime = mtime
+                info.mode = 0o644
+                tar.addfile(info, io.BytesIO(data))
+                del data
+    
+    def _export_key(
+        self,
+        network_data: Dict[str, Any],
+        routes: List[Dict[str, Any]],
+        simulation_config: Dict[str, Any],
+        selected_entry_points: Optional[List[str]],
+        selected_exit_points: Optional[List[str]],
+        vehicle_distribution: Optional[List[Any]]
+    ) -> str:
+        """Stable hash of everything that ends up in an export archive"""
+        payload = orjson.dumps(
+            {
+                "version": EXPORT_FORMAT_VERSION,
+                "network": network_data,
+                "routes": routes,
+                "config": simulation_config,
+                "entry_points": selected_entry_points or [],
+                "exit_points": selected_exit_points or [],
+                "vehicle_distribution": vehicle_distribution or []
+            },
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+            default=lambda obj: obj.model_dump()
+        )
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
+    def _zip_entry(self, filename: str, date_time: tuple) -> zipfile.ZipInfo:
+        """ZIP entry for generated content, extracted as a regular 0644 file"""
+        info = zipfile.ZipInfo(filename, date_time=date_time)
+        info.external_attr = 0o644 << 16
+        return info
+    
     async def get_export_info(self, zip_path: str) -> Dict[str, Any]:
         """
         Get information about an exported simulation
@@ -567,7 +811,9 @@ if __name__ == "__main__":
             Dictionary with export information
         """
         try:
-            file_size = os.path.getsize(zip_path)
+            # stat() can block on slow or network storage; only the first
+            # lookup for a path reaches the disk
+            file_size = await asyncio.to_thread(self._export_size_cached, zip_path)
             file_name = os.path.basename(zip_path)
             
             return {
@@ -590,6 +836,9 @@ if __name__ == "__main__":
         """
         Run simulation with SUMO GUI using temporary files
         
+        File generation, netconvert and the SUMO GUI start-up check all
+        block, so they run in a worker thread.
+        
         Args:
             network_data: Network data with nodes and edges
             routes: Route configurations
@@ -598,6 +847,20 @@ if __name__ == "__main__":
         Returns:
             Dictionary containing simulation run results
         """
+        return await asyncio.to_thread(
+            self._run_simulation_with_gui_sync,
+            network_data,
+            routes,
+            simulation_config
+        )
+    
+    def _run_simulation_with_gui_sync(
+        self, 
+        network_data: Dict[str, Any], 
+        routes: List[Dict[str, Any]], 
+        simulation_config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Synchronous implementation of run_simulation_with_gui"""
         try:
             # Create temporary directory for simulation files
             temp_dir = tempfile.mkdtemp(prefix="sumo_simulation_")
@@ -609,26 +872,11 @@ if __name__ == "__main__":
             simulation_time = simulation_config.get('simulation_time', 200)
             simulation_name = simulation_config.get('name', 'simulation')
             
-            # Generate SUMO files
-            nodes_content = self.create_nodes_file(nodes)
-            edges_content = self.create_edges_file(edges)
-            traffic_lights_content = self.create_traffic_lights_file(nodes)
-            route_content = self.create_route_file(routes)
-            config_content = self.create_sumo_config("network.net.xml", "routes.rou.xml", "traffic_lights.add.xml", simulation_time)
-            
-            # Write files to temporary directory
-            files_to_create = [
-                ("nodes.nod.xml", nodes_content),
-                ("edges.edg.xml", edges_content),
-                ("traffic_lights.add.xml", traffic_lights_content),
-                ("routes.rou.xml", route_content),
-                ("simulation.sumocfg", config_content)
-            ]
-            
-            for filename, content in files_to_create:
+            # Generate and write the SUMO files one at a time
+            for filename, generate in self._sumo_file_entries(nodes, edges, routes, simulation_time):
                 file_path = os.path.join(temp_dir, filename)
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                with open(file_path, 'wb') as f:
+                    f.write(self._encode_entry(generate))
                 logger.info(f"Created simulation file: {filename}")
             
             # Generate network with netconvert
@@ -703,7 +951,7 @@ if __name__ == "__main__":
         simulation_config: Dict[str, Any],
         selected_entry_points: List[str],
         selected_exit_points: List[str],
-        vehicle_distribution: List[Dict[str, Any]]
+        vehicle_distribution: Sequence[Union[VehicleDistribution, Dict[str, Any]]]
     ) -> str:
         """
         Create a JSON file with all simulation metadata for reconstruction
@@ -719,41 +967,87 @@ if __name__ == "__main__":
         Returns:
             JSON content as string
         """
+        metadata = self.build_simulation_metadata(
+            network_data=network_data,
+            routes=routes,
+            simulation_config=simulation_config,
+            selected_entry_points=selected_entry_points,
+            selected_exit_points=selected_exit_points,
+            vehicle_distribution=vehicle_distribution
+        )
+        return orjson.dumps(metadata, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    
+    def build_simulation_metadata(
+        self,
+        network_data: Dict[str, Any],
+        routes: List[Dict[str, Any]],
+        simulation_config: Dict[str, Any],
+        selected_entry_points: List[str],
+        selected_exit_points: List[str],
+        vehicle_distribution: Sequence[Union[VehicleDistribution, Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Build the simulation metadata dictionary shared by the JSON and MessagePack files
+        
+        Returns:
+            Metadata dictionary
+        """
         try:
             # Extract data
             nodes = network_data.get('nodes', [])
             edges = network_data.get('edges', [])
             bounds = network_data.get('bounds', {})
             
-            # Create comprehensive metadata
-            metadata = {
-                "simulation_info": {
-                    "name": simulation_config.get('name', 'simulation'),
-                    "created_at": time.time(),
-                    "version": "1.0",
-                    "description": "SUMO simulation metadata for reconstruction"
-                },
-                "network_data": {
-                    "id": network_data.get('id', ''),
-                    "name": network_data.get('name', ''),
-                    "bounds": bounds,
-                    "node_count": len(nodes),
-                    "edge_count": len(edges)
-                },
-                "nodes": [
+            # Membership sets built once instead of scanning the lists per node
+            entry_ids = frozenset(selected_entry_points)
+            exit_ids = frozenset(selected_exit_points)
+            
+            # MapService records carry every field, so fetch them in one
+            # itemgetter call; .get() defaults only for hand-built records
+            try:
+                node_records = [
                     {
-                        "id": node.get('id'),
+                        "id": node_id,
+                        "x": x,
+                        "y": y,
+                        "lat": lat,
+                        "lon": lon,
+                        "type": node_type,
+                        "is_entry_point": node_id in entry_ids,
+                        "is_exit_point": node_id in exit_ids
+                    }
+                    for node_id, x, y, lat, lon, node_type in map(_META_NODE_KEYS, nodes)
+                ]
+            except KeyError:
+                node_records = [
+                    {
+                        "id": node_id,
                         "x": node.get('x'),
                         "y": node.get('y'),
                         "lat": node.get('lat'),
                         "lon": node.get('lon'),
                         "type": node.get('type', 'priority'),
-                        "is_entry_point": node.get('id') in selected_entry_points,
-                        "is_exit_point": node.get('id') in selected_exit_points
+                        "is_entry_point": node_id in entry_ids,
+                        "is_exit_point": node_id in exit_ids
                     }
                     for node in nodes
-                ],
-                "edges": [
+                    for node_id in (node.get('id'),)
+                ]
+            try:
+                edge_records = [
+                    {
+                        "id": edge_id,
+                        "from": from_node,
+                        "to": to_node,
+                        "shape": shape,
+                        "length": length,
+                        "speed": speed,
+                        "lanes": lanes
+                    }
+                    for edge_id, from_node, to_node, shape, length, speed, lanes in map(_META_EDGE_KEYS, edges)
+                ]
+            except KeyError:
+                edge_records = [
                     {
                         "id": edge.get('id'),
                         "from": edge.get('from'),
@@ -764,19 +1058,33 @@ if __name__ == "__main__":
                         "lanes": edge.get('lanes')
                     }
                     for edge in edges
-                ],
+                ]
+            
+            # Create comprehensive metadata
+            metadata = {
+                "simulation_info": {
+                    "name": simulation_config.get('name', 'simulation'),
+                    "created_at": time.time(),
+                    "version": "1.0",
+                    "description": "SUMO simulation metadata for reconstruction"
+                },
+                "network_data": {
+                    "id": network_data.get('id', ''),
+                    "name": network_data.get('name', ''),
+                    "bounds": bounds,
+                    "node_count": len(nodes),
+                    "edge_count": len(edges)
+                },
+                "nodes": node_records,
+                "edges": edge_records,
                 "simulation_config": {
                     "total_vehicles": simulation_config.get('total_vehicles', 100),
                     "simulation_time": simulation_config.get('simulation_time', 3600),
                     "random_seed": simulation_config.get('random_seed'),
+                    # Entries are plain dicts or VehicleDistribution models
                     "vehicle_distribution": [
-                        {
-                            "vehicle_type": vd.get("vehicle_type") if isinstance(vd, dict) else vd.vehicle_type,
-                            "percentage": vd.get("percentage") if isinstance(vd, dict) else vd.percentage,
-                            "color": vd.get("color") if isinstance(vd, dict) else vd.color,
-                            "period": vd.get("period") if isinstance(vd, dict) else vd.period,
-                            "attributes": vd.get("attributes") if isinstance(vd, dict) else vd.attributes
-                        }
+                        {key: vd.get(key) for key in _VD_FIELDS} if isinstance(vd, dict)
+                        else dict(zip(_VD_FIELDS, _VD_ATTRS(vd)))
                         for vd in vehicle_distribution
                     ]
                 },
@@ -794,30 +1102,11 @@ if __name__ == "__main__":
                     }
                     for route in routes
                 ],
-                "reconstruction_info": {
-                    "instructions": "Para reconstruir esta simulación:",
-                    "steps": [
-                        "1. Cargar el archivo simulation_metadata.json",
-                        "2. Usar los datos de nodes y edges para recrear la red",
-                        "3. Aplicar la configuración de simulación",
-                        "4. Configurar los puntos de entrada y salida seleccionados",
-                        "5. Aplicar la distribución de vehículos",
-                        "6. Generar las rutas basadas en los datos de routes"
-                    ],
-                    "file_structure": {
-                        "nodes.nod.xml": "Definición de nodos de la red",
-                        "edges.edg.xml": "Definición de aristas de la red",
-                        "routes.rou.xml": "Rutas y flujos de vehículos",
-                        "simulation.sumocfg": "Configuración de la simulación",
-                        "traffic_lights.add.xml": "Semáforos detectados",
-                        "run_simulation.py": "Script para ejecutar la simulación",
-                        "simulation_metadata.json": "Metadatos completos para reconstrucción"
-                    }
-                }
+                "reconstruction_info": RECONSTRUCTION_INFO
             }
             
-            return json.dumps(metadata, indent=2, ensure_ascii=False)
+            return metadata
             
         except Exception as e:
-            logger.error(f"Error creating simulation metadata JSON: {e}")
-            raise Exception(f"Error creating metadata JSON: {str(e)}") 
\ No newline at end of file
+            logger.exception("Error creating simulation metadata JSON")
+            raise Exception(f"Error creating metadata JSON: {str(e)}") from e 
\ No newline at end of file
@@ -4,6 +4,8 @@ Web-based traffic simulation tool with OSM integration
 """
 
 from setuptools import setup, find_packages
+from functools import lru_cache
+from pathlib import Path
 import os
 
 # Read the README file
@@ -14,13 +16,16 @@ def read_readme():
             return f.read()
     return "SUMO Helper - Web-based traffic simulation tool"
 
-# Read requirements
+# Read requirements (parsed once per process, in a single pass over the lines)
+@lru_cache(maxsize=1)
 def read_requirements():
-    requirements_path = os.path.join(os.path.dirname(__file__), 'requirements.txt')
-    if os.path.exists(requirements_path):
-        with open(requirements_path, 'r', encoding='utf-8') as f:
-            return [line.strip() for line in f if line.strip() and not line.startswith('#')]
-    return []
+    requirements_path = Path(__file__).resolve().parent / 'requirements.txt'
+    if not requirements_path.is_file():
+        return ()
+    return tuple(
+        line for raw in requirements_path.read_text(encoding='utf-8').splitlines()
+        if (line := raw.strip()) and not line.startswith('#')
+    )
 
 setup(
     name="sumo-helper-backend",
@@ -33,7 +38,7 @@ setup(
     url="https://github.com/gsmkev/sumo-helper",
     packages=find_packages(),
     include_package_data=True,
-    install_requires=read_requirements(),
+    install_requires=list(read_requirements()),
     python_requires=">=3.11",
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -0,0 +1,22 @@
+"""
+Shared pytest setup
+
+Tests run with the testing configuration from a temporary working directory,
+so the relative static/ paths used by the app and services stay out of the repo.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+# Read by get_config() on first use, so these must be set before any app import
+os.environ.setdefault("ENVIRONMENT", "testing")
+os.environ.setdefault("LOG_FILE", os.devnull)
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Run each test from its own empty directory"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,75 @@
+"""
+File downloads: conditional requests, path checks and X-Accel-Redirect
+"""
+
+import dataclasses
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+ARCHIVE = "simulation_test.zip"
+
+
+@pytest.fixture
+def static_root(workdir: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Serve downloads from a temporary static directory holding one export"""
+    static = (workdir / "static").resolve()
+    exports = static / "exports"
+    exports.mkdir(parents=True)
+    (exports / ARCHIVE).write_bytes(b"PK\x05\x06" + b"\x00" * 18)
+    (static / "secret.txt").write_text("not an export")
+    monkeypatch.setattr(main, "STATIC_ROOT", static)
+    monkeypatch.setattr(main, "EXPORTS_DIR", exports)
+    return static
+
+
+@pytest.fixture
+def client(static_root: Path) -> Iterator[TestClient]:
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def test_download_sets_etag_and_answers_if_none_match_with_304(client: TestClient) -> None:
+    response = client.get(f"/api/simulations/download/{ARCHIVE}")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    etag = response.headers["etag"]
+
+    cached = client.get(f"/api/simulations/download/{ARCHIVE}", headers={"If-None-Match": f'"other", {etag}'})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+    stale = client.get(f"/api/simulations/download/{ARCHIVE}", headers={"If-None-Match": '"other"'})
+    assert stale.status_code == 200
+
+
+def test_resolve_within_rejects_paths_outside_base(static_root: Path) -> None:
+    exports = static_root / "exports"
+    (exports / "escape.zip").symlink_to(static_root / "secret.txt")
+
+    assert main.resolve_within(exports, ARCHIVE) is not None
+    assert main.resolve_within(exports, "../secret.txt") is None
+    assert main.resolve_within(exports, str(static_root / "secret.txt")) is None
+    assert main.resolve_within(exports, "escape.zip") is None
+    assert main.resolve_within(exports, "missing.zip") is None
+
+
+def test_download_rejects_traversal(client: TestClient) -> None:
+    assert client.get("/api/simulations/download/..%2Fsecret.txt").status_code == 404
+    assert client.get("/api/simulations/download/missing.zip").status_code == 404
+
+
+def test_x_accel_redirect_hands_the_file_to_nginx(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(main, "cfg", dataclasses.replace(main.cfg, USE_X_ACCEL=True, X_ACCEL_PREFIX="/_static"))
+
+    response = client.get(f"/api/simulations/download/{ARCHIVE}")
+
+    assert response.status_code == 200
+    assert response.headers["x-accel-redirect"] == f"/_static/exports/{ARCHIVE}"
+    assert response.headers["content-disposition"] == f'attachment; filename="{ARCHIVE}"'
+    assert response.content == b""
@@ -0,0 +1,59 @@
+"""
+Round trips of exported simulation archives
+"""
+
+import io
+import tarfile
+import zipfile
+from typing import Dict
+
+import orjson
+import pytest
+
+from models.schemas import VehicleDistribution
+from services.sumo_export_service import SUMOExportService
+
+zstandard = pytest.importorskip("zstandard")
+
+NETWORK = {
+    "nodes": [{"id": f"n{i}", "x": i * 10.0, "y": 0.0, "type": "priority"} for i in range(3)],
+    "edges": [
+        {"id": "e0", "from": "n0", "to": "n1", "lanes": 1, "speed": 13.89, "length": 10.0},
+        {"id": "e1", "from": "n1", "to": "n2", "lanes": 1, "speed": 13.89, "length": 10.0},
+    ],
+}
+ROUTES = [{"id": "route_car_0", "edges": "e0 e1", "vehicle_type": "car", "start_time": 0.0, "color": "yellow"}]
+CONFIG = {"name": "roundtrip", "total_vehicles": 1, "simulation_time": 120}
+
+
+def _export(archive_format: str) -> str:
+    service = SUMOExportService()
+    return service._export_simulation_sync(
+        NETWORK, ROUTES, CONFIG,
+        selected_entry_points=["n0"],
+        selected_exit_points=["n2"],
+        vehicle_distribution=[VehicleDistribution(vehicle_type="car", percentage=100)],
+        archive_format=archive_format
+    )
+
+
+def _read_tar_zst(path: str) -> Dict[str, bytes]:
+    with open(path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as stream, \
+            tarfile.open(fileobj=stream, mode="r|") as tar:
+        return {member.name: tar.extractfile(member).read() for member in tar}
+
+
+def test_tar_zst_export_round_trip() -> None:
+    path = _export("tar.zst")
+    assert path.endswith(".tar.zst")
+
+    with zipfile.ZipFile(_export("zip")) as zipf:
+        expected = {name: zipf.read(name) for name in zipf.namelist()}
+
+    members = _read_tar_zst(path)
+    assert members.keys() == expected.keys()
+    assert "routes.rou.xml" in members and "simulation_metadata.msgpack" in members
+
+    # Archives are reused across exports, so neither embeds a creation time
+    assert members == expected
+    assert "created_at" not in orjson.loads(members["simulation_metadata.json"])["simulation_info"]
@@ -0,0 +1,38 @@
+"""
+On-disk cache pruning
+"""
+
+import os
+import time
+from pathlib import Path
+
+from services.file_cache import prune_cache_dir
+
+
+def _entry(directory: Path, name: str, age: float) -> Path:
+    path = directory / name
+    path.write_bytes(b"x")
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_keeps_newest_entries(tmp_path: Path) -> None:
+    paths = [_entry(tmp_path, f"{i}.zip", age=100 * (i + 1)) for i in range(3)]
+    _entry(tmp_path, "other.txt", age=1000)
+
+    removed = prune_cache_dir(str(tmp_path), ".zip", max_entries=1)
+
+    assert sorted(removed) == sorted(str(path) for path in paths[1:])
+    assert sorted(os.listdir(tmp_path)) == ["0.zip", "other.txt"]
+
+
+def test_prune_spares_recently_used_entries(tmp_path: Path) -> None:
+    _entry(tmp_path, "fresh.zip", age=1)
+    _entry(tmp_path, "recent.zip", age=5)
+    old = _entry(tmp_path, "old.zip", age=600)
+
+    removed = prune_cache_dir(str(tmp_path), ".zip", max_entries=0, min_age=60)
+
+    assert removed == [str(old)]
+    assert sorted(os.listdir(tmp_path)) == ["fresh.zip", "recent.zip"]
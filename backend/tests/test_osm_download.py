@@ -0,0 +1,44 @@
+"""
+Coalescing of concurrent OSM downloads
+"""
+
+import asyncio
+from typing import Any, List
+
+import pytest
+
+from services.osmnx_service import OSMNXService
+
+BBOX = (52.52, 52.51, 13.41, 13.40)
+
+
+async def _cancel_first_caller() -> List[Any]:
+    service = OSMNXService()
+    release = asyncio.Event()
+    downloads = []
+
+    async def fake_load_or_download(cache_file: str, *args: Any) -> str:
+        downloads.append(cache_file)
+        await release.wait()
+        return "graph"
+
+    service._load_or_download = fake_load_or_download  # type: ignore[method-assign]
+    first = asyncio.create_task(service._fetch_graph(*BBOX, "filter"))
+    second = asyncio.create_task(service._fetch_graph(*BBOX, "filter"))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    return [await second, len(downloads), service._inflight]
+
+
+def test_cancelled_caller_does_not_cancel_shared_download() -> None:
+    result, download_count, inflight = asyncio.run(_cancel_first_caller())
+
+    assert result == "graph"
+    assert download_count == 1
+    assert inflight == {}
@@ -0,0 +1,71 @@
+"""
+Route selection of generated vehicle routes
+"""
+
+import heapq
+import random
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from models.schemas import VehicleDistribution
+from services.sumo_export_service import SUMOExportService
+
+
+def reference_path(edges: List[Dict[str, Any]], start: str, goal: str) -> Optional[List[str]]:
+    """The heap-based search route generation used before the breadth-first rewrite"""
+    graph: Dict[str, List[Any]] = {}
+    for edge in edges:
+        graph.setdefault(edge['from'], []).append((edge['to'], edge['id']))
+    queue: List[Any] = [(0, start, [])]
+    visited = set()
+    while queue:
+        cost, node, path = heapq.heappop(queue)
+        if node == goal:
+            return path
+        if node in visited:
+            continue
+        visited.add(node)
+        for neighbor, edge_id in graph.get(node, []):
+            if neighbor not in visited:
+                heapq.heappush(queue, (cost + 1, neighbor, path + [edge_id]))
+    return None
+
+
+def generated_path(edges: List[Dict[str, Any]], start: str, goal: str) -> Optional[List[str]]:
+    routes = SUMOExportService()._generate_routes_with_vehicles_sync(
+        {"edges": edges}, 1,
+        [VehicleDistribution(vehicle_type="car", percentage=100)],
+        [start], [goal], 60, random_seed=0
+    )
+    return routes[0]["edges"].split() if routes else None
+
+
+def _edge(edge_id: str, from_node: str, to_node: str) -> Dict[str, Any]:
+    return {"id": edge_id, "from": from_node, "to": to_node}
+
+
+# Two equal-length routes a -> d: via b (node id first) or via c (edge ids first)
+DIAMOND = [_edge("e2", "a", "b"), _edge("e1", "a", "c"), _edge("e3", "b", "d"), _edge("e4", "c", "d")]
+
+
+def test_equal_length_tie_is_broken_by_edge_ids() -> None:
+    assert reference_path(DIAMOND, "a", "d") == ["e1", "e4"]
+    assert generated_path(DIAMOND, "a", "d") == ["e1", "e4"]
+
+
+def test_shorter_route_wins_over_smaller_edge_ids() -> None:
+    edges = DIAMOND + [_edge("e0", "a", "x"), _edge("e00", "x", "y"), _edge("e000", "y", "d"), _edge("e9", "a", "d")]
+    assert generated_path(edges, "a", "d") == reference_path(edges, "a", "d") == ["e9"]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_reference_on_random_graphs(seed: int) -> None:
+    rng = random.Random(seed)
+    nodes = [f"n{i}" for i in range(rng.randint(4, 12))]
+    # Few distinct nodes and many edges give many equal-length alternatives
+    edges = [_edge(f"e{rng.randint(0, 99)}", rng.choice(nodes), rng.choice(nodes)) for _ in range(rng.randint(5, 40))]
+    for start in nodes[:3]:
+        for goal in nodes:
+            expected = reference_path(edges, start, goal)
+            assert generated_path(edges, start, goal) == (expected or None), (start, goal)
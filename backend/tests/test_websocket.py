@@ -0,0 +1,56 @@
+"""
+WebSocket frame shape
+"""
+
+import asyncio
+from typing import Any, List
+
+import orjson
+from fastapi.testclient import TestClient
+
+import main
+
+
+class RecordingWebSocket:
+    """Stands in for a WebSocket, recording the text frames sent to it"""
+
+    def __init__(self) -> None:
+        self.frames: List[str] = []
+
+    async def send_text(self, data: str) -> None:
+        self.frames.append(data)
+
+
+async def _drain(messages: List[str]) -> List[Any]:
+    websocket = RecordingWebSocket()
+    send_queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=main.WS_SEND_QUEUE_SIZE)
+    # Queue the whole burst before the writer task gets to run
+    for message in messages:
+        main.enqueue_message(send_queue, message)
+    writer = asyncio.create_task(main.drain_send_queue(websocket, send_queue))  # type: ignore[arg-type]
+    while not send_queue.empty():
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    writer.cancel()
+    return [orjson.loads(frame) for frame in websocket.frames]
+
+
+def test_burst_is_sent_as_array_frames() -> None:
+    messages = [f"message {i}" for i in range(main.WS_COALESCE_MAX + 5)]
+    frames = asyncio.run(_drain(messages))
+
+    assert len(frames) == 2
+    assert all(isinstance(frame, list) for frame in frames)
+    assert len(frames[0]) == main.WS_COALESCE_MAX
+    assert [message for frame in frames for message in frame] == messages
+
+
+def test_single_message_has_the_same_shape() -> None:
+    # A lone message that is itself a JSON array stays distinguishable from a batch
+    assert asyncio.run(_drain(['["not", "a", "batch"]'])) == [['["not", "a", "batch"]']]
+
+
+def test_echo_over_websocket() -> None:
+    with TestClient(main.app) as client, client.websocket_connect("/ws") as websocket:
+        websocket.send_text("hello")
+        assert websocket.receive_json() == ["Message received: hello"]
@@ -61,14 +61,10 @@ check_prerequisites() {
 create_directories() {
     log "Creating necessary directories..."
     
-    mkdir -p static/exports
-    mkdir -p static/uploads
-    mkdir -p logs
+    mkdir -p static/exports static/uploads logs
     
     # Set proper permissions
-    chmod 755 static/exports
-    chmod 755 static/uploads
-    chmod 755 logs
+    chmod 755 static/exports static/uploads logs
     
     success "Directories created successfully"
 }
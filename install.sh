@@ -78,18 +78,24 @@ install_backend() {
     # Activate virtual environment
     source venv/bin/activate
     
-    # Upgrade pip
-    log "Upgrading pip..."
-    pip install --upgrade pip
+    # Prefer uv's resolver when available; fall back to non-interactive pip
+    if command -v uv &> /dev/null; then
+        log "Using uv to install Python dependencies"
+        PIP_INSTALL="uv pip install"
+    else
+        log "Upgrading pip (install uv for faster dependency installs)..."
+        pip install --disable-pip-version-check --no-input --upgrade pip
+        PIP_INSTALL="pip install --disable-pip-version-check --prefer-binary --no-input"
+    fi
     
     # Install dependencies
     log "Installing Python dependencies..."
-    pip install -r requirements.txt
+    $PIP_INSTALL -r requirements.txt
     
     # Install development dependencies if file exists
     if [ -f "requirements-dev.txt" ]; then
         log "Installing development dependencies..."
-        pip install -r requirements-dev.txt
+        $PIP_INSTALL -r requirements-dev.txt
     fi
     
 
@@ -116,14 +122,10 @@ install_frontend() {
 create_directories() {
     log "Creating necessary directories..."
     
-    mkdir -p static/exports
-    mkdir -p static/uploads
-    mkdir -p logs
+    mkdir -p static/exports static/uploads logs
     
     # Set proper permissions
-    chmod 755 static/exports
-    chmod 755 static/uploads
-    chmod 755 logs
+    chmod 755 static/exports static/uploads logs
     
     success "Directories created successfully"
 }